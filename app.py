@@ -8,8 +8,10 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import matplotlib.ticker as mtick
 from sqlalchemy import text
+import os
 
-from db.connection import get_engine
+from db.connection import get_engine, get_pool_status
+from db.query_stats import start_rerun, view_scope, log_rerun_summary
 from auth import verify_login, register_user, get_user_by_username
 from process_expenses import update_balances_from_expenses
 from reset_password import reset_user_password
@@ -18,11 +20,14 @@ from views.login import show_login,show_registration,show_recovery
 from views.reports import show_reports
 from views.dashboard import show_dashboard
 from views.password_change import show_password_change
+from views.query_stats import show_query_stats
+from views.import_statements import show_statement_import
 
 
 
 engine = get_engine()
 st.set_page_config(page_title="Expense Tracker Dashboard", layout="wide")
+rerun = start_rerun()
 
 # Initialize session state
 if "authenticated" not in st.session_state:
@@ -88,13 +93,24 @@ if not st.session_state.authenticated:
 # --- Main App View ---
 st.title("💵 Expense Tracker Dashboard")
 st.sidebar.header("Navigation")
-view = st.sidebar.radio("", ["Dashboard", "Reports 📊", "Input Form", "Change Password"])
-
-if view == "Dashboard":
-    show_dashboard(engine, st.session_state.user_id)
-elif view == "Reports 📊":
-    show_reports(engine)
-elif view == "Input Form":
-    show_expense_form(engine, st.session_state.user_id)
-elif view == "Change Password":
-    show_password_change(engine)
+view = st.sidebar.radio("", ["Dashboard", "Reports 📊", "Input Form", "Import Statement", "Change Password"])
+
+rerun["label"] = view
+
+with view_scope(view):
+    if view == "Dashboard":
+        show_dashboard(engine, st.session_state.user_id)
+    elif view == "Reports 📊":
+        show_reports(engine)
+    elif view == "Input Form":
+        show_expense_form(engine, st.session_state.user_id)
+    elif view == "Import Statement":
+        show_statement_import(engine, st.session_state.user_id)
+    elif view == "Change Password":
+        show_password_change(engine)
+
+# --- Query Stats (admins only) ---
+summary = log_rerun_summary(rerun)
+admin_usernames = [u.strip() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()]
+if st.session_state.username in admin_usernames:
+    show_query_stats(rerun, summary, get_pool_status())
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized date features for report frames. Everything here works on whole columns,
+# so callers should filter to the window they need first and derive features once.
+
+
+def week_of_month(dates):
+    # Calendar rows of the month, weeks starting Monday: day 1 is always week 1
+    dates = pd.to_datetime(dates)
+    first_weekday = (dates - pd.to_timedelta(dates.dt.day - 1, unit="D")).dt.weekday
+    return ((dates.dt.day + first_weekday - 1) // 7 + 1).astype(np.int8)
+
+
+def billing_cycle(dates, statement_day=1):
+    # First day of the billing cycle each date falls in; the cycle opens on statement_day
+    if not 1 <= statement_day <= 28:
+        raise ValueError("statement_day must be between 1 and 28")
+    dates = pd.to_datetime(dates)
+    months = dates.dt.to_period("M")
+    months = months.where(dates.dt.day >= statement_day, months - 1)
+    return months.dt.start_time + pd.Timedelta(days=statement_day - 1)
+
+
+def add_calendar_features(df, date_col="date", statement_day=1):
+    dates = pd.to_datetime(df[date_col])
+    iso = dates.dt.isocalendar()
+    return df.assign(
+        month=dates.dt.to_period("M"),
+        iso_year=iso["year"].astype(np.int16),
+        iso_week=iso["week"].astype(np.int8),
+        week_of_month=week_of_month(dates),
+        weekday=dates.dt.weekday.astype(np.int8),
+        billing_cycle=billing_cycle(dates, statement_day),
+    )
+
+
+def week_totals(df, months, weeks=4, value_col="amount"):
+    # One groupby for every (month, week) bucket; missing buckets come back as 0.
+    # Returns weeks as rows and the requested months (Periods) as columns, in order.
+    totals = df.groupby(["week_of_month", "month"])[value_col].sum().unstack("month")
+    return totals.reindex(index=range(1, weeks + 1), columns=months, fill_value=0).fillna(0)
+
+
+# Report periods: each resolves to an inclusive (start, end) pair of dates for date BETWEEN
+PERIODS = ["This Month", "This Quarter", "Year to Date", "Trailing Months", "Custom Range"]
+
+# The trend needs several months to show one, so reports open on a trailing window
+DEFAULT_PERIOD = "Trailing Months"
+DEFAULT_TRAILING_MONTHS = 4
+
+
+def period_bounds(period, today, months=DEFAULT_TRAILING_MONTHS, custom=None):
+    today = pd.Timestamp(today).normalize()
+    if period == "This Month":
+        start = today.to_period("M").start_time
+    elif period == "This Quarter":
+        start = today.to_period("Q").start_time
+    elif period == "Year to Date":
+        return today.replace(month=1, day=1).date(), today.date()
+    elif period == "Trailing Months":
+        start = (today.to_period("M") - (months - 1)).start_time
+    elif period == "Custom Range":
+        start, end = (pd.Timestamp(d) for d in custom)
+        return min(start, end).date(), max(start, end).date()
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    end = today.to_period("Q" if period == "This Quarter" else "M").end_time
+    return start.date(), end.date()
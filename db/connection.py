@@ -1,12 +1,80 @@
+import os
+import threading
+
+from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+
+from db.query_stats import attach_query_stats
+
+load_dotenv()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_pool_settings():
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+
+
+def get_engine_url():
+    # Credentials come only from the environment (or .env); checked when the engine is
+    # first built, so modules that never connect can still be imported without them
+    password = os.getenv("DB_PASSWORD")
+    if not password:
+        raise RuntimeError("DB_PASSWORD is not set. Add it to the environment or .env before connecting.")
+
+    # URL.create escapes each part itself; any character in the password survives as is
+    return URL.create(
+        drivername="mysql+pymysql",
+        username=os.getenv("DB_USER", "root"),
+        password=password,
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", 3306)),
+        database=os.getenv("DB_NAME", "expense_tracker"),
+    )
+
 
 def get_engine():
-    user = "root"
-    password = "ZlgxuQZzIcKuOtVvpKURGRvCFvxqIqLj"
-    host = "maglev.proxy.rlwy.net"
-    database = "railway"
-    port = 45257
-
-    engine_url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-    engine = create_engine(engine_url)
-    return engine
+    # One engine (and one connection pool) per process, shared by every module
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(get_engine_url(), **get_pool_settings())
+                if _env_bool("DB_QUERY_STATS", True):
+                    attach_query_stats(engine)
+                _engine = engine
+    return _engine
+
+
+def get_pool_status():
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "status": pool.status(),
+    }
+
+
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
@@ -0,0 +1,100 @@
+import os
+
+import duckdb
+import pandas as pd
+
+# The report_queries functions as SQL over a user's local snapshot (db/snapshot.py), run by
+# DuckDB. The Arrow table is scanned in place, in parallel, and only aggregates come back.
+
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", 0))
+
+_db = duckdb.connect(database=":memory:")
+if DUCKDB_THREADS:
+    _db.execute(f"SET threads = {DUCKDB_THREADS}")
+
+# Totals are grouped by category/subcategory id; names are carried along for display only
+CATEGORY_FILTER = "category_id IS NOT NULL AND TRIM(COALESCE(category, '')) <> '' AND category <> 'Income'"
+
+
+def _query(table, sql, params=None):
+    # A cursor is a separate connection to the same database: safe across sessions/threads,
+    # and the registered table is only visible to it
+    cur = _db.cursor()
+    try:
+        cur.register("expenses", table)
+        return cur.execute(sql, params or []).df()
+    finally:
+        cur.close()
+
+
+def _date(value):
+    return pd.Timestamp(value).date()
+
+
+def fetch_monthly_totals(table, user_id, start_date, end_date):
+    df = _query(table, """
+        SELECT date_trunc('month', date) AS month, SUM(amount) AS amount
+        FROM expenses
+        WHERE type = 'expense' AND date BETWEEN ? AND ?
+        GROUP BY 1
+        ORDER BY 1
+    """, [_date(start_date), _date(end_date)])
+    df['month'] = pd.to_datetime(df['month']).dt.strftime('%b %Y')
+    return df
+
+
+def fetch_daily_totals(table, user_id, start_date, end_date):
+    df = _query(table, """
+        SELECT date, SUM(amount) AS amount
+        FROM expenses
+        WHERE type = 'expense' AND date BETWEEN ? AND ?
+        GROUP BY date
+    """, [_date(start_date), _date(end_date)])
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def fetch_category_totals(table, user_id, start_date, end_date):
+    return _query(table, f"""
+        SELECT category_id, FIRST(category) AS category, SUM(amount) AS amount
+        FROM expenses
+        WHERE type = 'expense' AND date BETWEEN ? AND ? AND {CATEGORY_FILTER}
+        GROUP BY category_id
+        ORDER BY amount DESC
+    """, [_date(start_date), _date(end_date)])
+
+
+def fetch_subcategory_totals(table, user_id, start_date, end_date, category_id):
+    df = _query(table, """
+        SELECT FIRST(subcategory) AS subcategory, SUM(amount) AS amount
+        FROM expenses
+        WHERE type = 'expense' AND date BETWEEN ? AND ?
+          AND category_id = ? AND subcategory_id IS NOT NULL AND COALESCE(subcategory, '') <> ''
+        GROUP BY subcategory_id
+        ORDER BY amount DESC
+    """, [_date(start_date), _date(end_date), category_id])
+    return df.set_index('subcategory')['amount']
+
+
+def fetch_salary_income(table, user_id, start_date, end_date):
+    df = _query(table, """
+        SELECT SUM(amount) AS total FROM expenses
+        WHERE type = 'income' AND date BETWEEN ? AND ?
+          AND subcategory_id IS NOT NULL AND subcategory = 'Salary'
+    """, [_date(start_date), _date(end_date)])
+    total = df['total'].iloc[0]
+    return float(0 if pd.isna(total) else total)
+
+
+def fetch_debt_payment_totals(table, user_id, start_date, end_date):
+    # ILIKE matches MySQL's case-insensitive LIKE
+    row = _query(table, """
+        SELECT
+            SUM(CASE WHEN subcategory ILIKE '%Credit Card%' THEN amount ELSE 0 END) AS credit_card,
+            SUM(CASE WHEN subcategory ILIKE '%Splitwise%' THEN amount ELSE 0 END) AS splitwise,
+            SUM(CASE WHEN subcategory ILIKE '%India Transfer%' OR paid_to ILIKE '%India Transfer%'
+                     THEN amount ELSE 0 END) AS india_transfer
+        FROM expenses
+        WHERE type = 'debt_payment' AND date BETWEEN ? AND ?
+    """, [_date(start_date), _date(end_date)]).iloc[0]
+    return {key: float(0 if pd.isna(row[key]) else row[key]) for key in ("credit_card", "splitwise", "india_transfer")}
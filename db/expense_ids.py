@@ -0,0 +1,74 @@
+from sqlalchemy import text
+
+# Integer references stored next to the free-text names on each expense (dual write).
+# (id column, referenced table, name column on expenses); accounts and people are per user.
+ACCOUNT_REFERENCES = [
+    ("payment_account_id", "checking_accounts", "payment_method"),
+    ("credit_card_id", "credit_cards", "used_credit_card"),
+    ("paid_to_account_id", "checking_accounts", "paid_to"),
+    ("paid_to_card_id", "credit_cards", "paid_to"),
+    ("splitwise_person_id", "splitwise_people", "splitwise_person"),
+]
+
+EXPENSE_ID_COLUMNS = ["category_id", "subcategory_id"] + [ref[0] for ref in ACCOUNT_REFERENCES]
+
+
+def _lookup_sql(id_column, user_id, category, subcategory, names):
+    # Correlated lookup for one reference. Each is an index read: the account tables on their
+    # (user_id, name) unique keys, categories and subcategories on the name indexes of migration 8
+    if id_column == "category_id":
+        return f"(SELECT MIN(c.id) FROM categories c WHERE c.name = {category})"
+    if id_column == "subcategory_id":
+        return (
+            "(SELECT MIN(s.id) FROM subcategories s "
+            f"WHERE s.category_name = {category} AND s.sub_category_name = {subcategory})"
+        )
+    table, name = names[id_column]
+    return f"(SELECT MIN(r.id) FROM {table} r WHERE r.user_id = {user_id} AND r.name = {name})"
+
+
+def resolved_id_columns(alias="e"):
+    # SELECT-list fragment: stored id when present, otherwise resolved from the name
+    names = {id_col: (table, f"{alias}.{name_col}") for id_col, table, name_col in ACCOUNT_REFERENCES}
+    return ",\n".join(
+        f"COALESCE({alias}.{col}, "
+        f"{_lookup_sql(col, f'{alias}.user_id', f'{alias}.category', f'{alias}.subcategory', names)}) AS {col}"
+        for col in EXPENSE_ID_COLUMNS
+    )
+
+
+def resolve_ids_select(user_id, category, subcategory, names):
+    # "SELECT <lookup> AS <id column>, ..." for every reference; names maps each account
+    # name column (payment_method, ...) to the SQL for its value
+    tables = {id_col: (table, names[name_col]) for id_col, table, name_col in ACCOUNT_REFERENCES}
+    return "SELECT " + ", ".join(
+        f"{_lookup_sql(col, user_id, category, subcategory, tables)} AS {col}"
+        for col in EXPENSE_ID_COLUMNS
+    )
+
+
+def resolve_expense_ids(conn, expense):
+    # One round trip resolving every name on an in-memory expense to its id
+    names = {name_col: f":{name_col}" for _, _, name_col in ACCOUNT_REFERENCES}
+    params = {key: expense.get(key) for key in (
+        "user_id", "category", "subcategory", "payment_method",
+        "used_credit_card", "paid_to", "splitwise_person",
+    )}
+    row = conn.execute(
+        text(resolve_ids_select(":user_id", ":category", ":subcategory", names)), params
+    ).mappings().fetchone()
+    return dict(row)
+
+
+def backfill_expense_ids(conn, min_id=0):
+    names = {id_col: (table, f"e.{name_col}") for id_col, table, name_col in ACCOUNT_REFERENCES}
+    assignments = ",\n".join(
+        f"{col} = COALESCE({col}, {_lookup_sql(col, 'e.user_id', 'e.category', 'e.subcategory', names)})"
+        for col in EXPENSE_ID_COLUMNS
+    )
+    result = conn.execute(text(f"""
+        UPDATE expenses e
+        SET {assignments}
+        WHERE e.id > :min_id
+    """), {"min_id": min_id})
+    return result.rowcount
@@ -0,0 +1,57 @@
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from db.query_stats import current_rerun
+
+logger = logging.getLogger("expense_tracker.frames")
+
+# Low-cardinality text columns: a handful of distinct values repeated on every row
+CATEGORICAL_COLUMNS = [
+    "type", "category", "subcategory", "payment_method", "used_credit_card",
+    "paid_to", "is_splitwise", "splitwise_person",
+]
+
+# DECIMAL columns arrive as Python Decimal objects and become float64, which is exact to the
+# cent far beyond any balance or total here. Never float32: 1234.56 would read 1234.56005859375.
+AMOUNT_COLUMNS = [
+    "amount", "current_balance", "total_limit", "used_limit", "available_limit", "net_balance",
+]
+
+
+def compact_frame(df):
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS and df[col].dtype == object:
+            # Only worth it when values repeat; a one-row-per-category aggregate stays as is
+            if df[col].nunique() <= len(df) // 2:
+                df[col] = df[col].astype("category")
+        elif col in AMOUNT_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+        elif col == "id" or col.endswith("_id"):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def frame_memory(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def read_frame(conn, query, params=None, label=None):
+    # Every view reads expense-shaped rows through here: typed, compact, and accounted for
+    raw = pd.read_sql(query, conn, params=params)
+    df = compact_frame(raw)
+
+    record = {
+        "label": label or "-",
+        "rows": len(df),
+        "bytes": frame_memory(df),
+        "raw_bytes": frame_memory(raw),
+    }
+    rerun = current_rerun()
+    if rerun is not None:
+        rerun.setdefault("frames", []).append(record)
+    logger.debug(json.dumps(record))
+    return df
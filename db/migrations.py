@@ -0,0 +1,339 @@
+import sys
+from sqlalchemy import text
+from db.connection import get_engine
+from db.expense_ids import ACCOUNT_REFERENCES, EXPENSE_ID_COLUMNS, backfill_expense_ids, resolve_ids_select
+
+# Versioned schema for the tracker. Version 1 matches the tables the app already expects,
+# so it is a no-op on an existing database. Migrations only ever append.
+
+CREATE_SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Monthly totals per category and subcategory id; 0 stands for none (or a name without an id)
+CREATE_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS expense_rollups (
+        user_id INT NOT NULL,
+        month DATE NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        category_id INT NOT NULL DEFAULT 0,
+        subcategory_id INT NOT NULL DEFAULT 0,
+        total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        txn_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, month, type, category_id, subcategory_id)
+    )
+"""
+
+# Recomputes expense_rollups from expenses; {where} narrows it to one user
+FILL_ROLLUPS = """
+    INSERT INTO expense_rollups (user_id, month, type, category_id, subcategory_id, total_amount, txn_count)
+    SELECT user_id, DATE_FORMAT(date, '%Y-%m-01'), type,
+           COALESCE(category_id, 0), COALESCE(subcategory_id, 0),
+           SUM(amount), COUNT(*)
+    FROM expenses
+    {where}
+    GROUP BY user_id, DATE_FORMAT(date, '%Y-%m-01'), type, COALESCE(category_id, 0), COALESCE(subcategory_id, 0)
+"""
+
+CREATE_WATERMARK_TABLE = """
+    CREATE TABLE IF NOT EXISTS balance_watermarks (
+        user_id INT NOT NULL PRIMARY KEY,
+        last_applied_id BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(100) NOT NULL UNIQUE,
+        name VARCHAR(255),
+        email VARCHAR(255),
+        password_hash VARCHAR(255) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS expenses (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT NOT NULL,
+        date DATE NOT NULL,
+        type VARCHAR(32) NOT NULL,
+        amount DECIMAL(12, 2) NOT NULL,
+        payment_method VARCHAR(255),
+        used_credit_card VARCHAR(255),
+        paid_to VARCHAR(255),
+        category VARCHAR(255),
+        subcategory VARCHAR(255),
+        is_splitwise VARCHAR(8),
+        splitwise_person VARCHAR(255),
+        description TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS categories (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        type VARCHAR(32)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subcategories (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        category_name VARCHAR(255) NOT NULL,
+        sub_category_name VARCHAR(255) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payment_methods (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS credit_cards (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        name VARCHAR(255) NOT NULL,
+        total_limit DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        used_limit DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        available_limit DECIMAL(12, 2) AS (total_limit - used_limit)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checking_accounts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        name VARCHAR(255) NOT NULL,
+        current_balance DECIMAL(12, 2) NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS splitwise_people (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        name VARCHAR(255) NOT NULL,
+        net_balance DECIMAL(12, 2) NOT NULL DEFAULT 0,
+        last_updated TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def _create_tables(*statements):
+    def step(conn):
+        for statement in statements:
+            conn.execute(text(statement))
+    return step
+
+
+def _add_index(table, name, columns, unique=False):
+    # MySQL has no CREATE INDEX IF NOT EXISTS, so look it up first
+    def step(conn):
+        exists = conn.execute(text("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :name
+        """), {"table": table, "name": name}).scalar()
+        if not exists:
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            conn.execute(text(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})"))
+    return step
+
+
+def _add_column(table, column, definition):
+    def step(conn):
+        exists = conn.execute(text("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column
+        """), {"table": table, "column": column}).scalar()
+        if not exists:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+    return step
+
+
+def _run(statement):
+    def step(conn):
+        conn.execute(text(statement))
+    return step
+
+
+MIGRATIONS = [
+    (1, "base tables", [_create_tables(*BASE_TABLES)]),
+    (2, "rollups and balance watermarks", [
+        _create_tables(CREATE_ROLLUP_TABLE, CREATE_WATERMARK_TABLE),
+        # Balances already include every existing expense (applied by the old per-row code)
+        _run("""
+            INSERT IGNORE INTO balance_watermarks (user_id, last_applied_id)
+            SELECT user_id, MAX(id) FROM expenses GROUP BY user_id
+        """),
+    ]),
+    (3, "indexes for hot queries", [
+        _add_index("expenses", "idx_expenses_user_type_date", ["user_id", "type", "date"]),
+        _add_index("expenses", "idx_expenses_user_id", ["user_id", "id"]),
+        _add_index("checking_accounts", "uq_checking_accounts_user_name", ["user_id", "name"], unique=True),
+        _add_index("credit_cards", "uq_credit_cards_user_name", ["user_id", "name"], unique=True),
+        _add_index("splitwise_people", "uq_splitwise_people_user_name", ["user_id", "name"], unique=True),
+        _add_index("users", "idx_users_email", ["email"]),
+    ]),
+    (4, "integer references on expenses", [
+        *[_add_column("expenses", column, "INT NULL") for column in EXPENSE_ID_COLUMNS],
+        backfill_expense_ids,
+    ]),
+    (5, "import fingerprints", [
+        _add_column("expenses", "fingerprint", "CHAR(40) NULL"),
+        _add_index("expenses", "uq_expenses_user_fingerprint", ["user_id", "fingerprint"], unique=True),
+    ]),
+    (6, "category ids on subcategories", [
+        _add_column("subcategories", "category_id", "INT NULL"),
+        _run("""
+            UPDATE subcategories s
+            SET s.category_id = (SELECT MIN(c.id) FROM categories c WHERE c.name = s.category_name)
+            WHERE s.category_id IS NULL
+        """),
+    ]),
+    (7, "expense rollups keyed by category ids", [
+        # Rollups are derived data: replace the name-keyed table and recount every expense
+        # once (they only received new expenses since migration 2)
+        _run("DROP TABLE IF EXISTS expense_rollups"),
+        _create_tables(CREATE_ROLLUP_TABLE),
+        _run(FILL_ROLLUPS.format(where="")),
+    ]),
+    (8, "indexes for name to id lookups", [
+        # Every submit, pending-row scan and backfill resolves names with these point reads
+        _add_index("categories", "idx_categories_name", ["name"]),
+        _add_index("subcategories", "idx_subcategories_names", ["category_name", "sub_category_name"]),
+    ]),
+    (9, "indexes for transaction history filters", [
+        # Each equality filter reads its own index already in page order (id DESC)
+        _add_index("expenses", "idx_expenses_user_category_id", ["user_id", "category_id", "id"]),
+        _add_index("expenses", "idx_expenses_user_type_id", ["user_id", "type", "id"]),
+        _add_index("expenses", "idx_expenses_user_method_id", ["user_id", "payment_method", "id"]),
+        # Date ranges page in (date, id) order and seek here
+        _add_index("expenses", "idx_expenses_user_date_id", ["user_id", "date", "id"]),
+    ]),
+]
+
+
+def get_schema_version(conn):
+    conn.execute(text(CREATE_SCHEMA_MIGRATIONS))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def migrate(engine):
+    with engine.begin() as conn:
+        current = get_schema_version(conn)
+
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        # DDL commits implicitly in MySQL, so every step is written to be re-runnable
+        with engine.begin() as conn:
+            for step in steps:
+                step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                {"v": version, "d": description}
+            )
+        applied.append(version)
+        print(f"✅ Applied migration {version}: {description}")
+
+    if not applied:
+        print(f"ℹ️ Schema is up to date (version {current}).")
+    return applied
+
+
+# (name, statement) pairs the app runs on every page view or balance update.
+# Placeholder values only need to be type-correct for EXPLAIN.
+HOT_QUERIES = [
+    ("reports: daily totals", """
+        SELECT date, SUM(amount) FROM expenses
+        WHERE user_id = 1 AND type = 'expense' AND date BETWEEN '2024-01-01' AND '2024-02-29'
+        GROUP BY date
+    """),
+    ("reports: category totals, custom range", """
+        SELECT category_id, SUM(amount) FROM expenses
+        WHERE user_id = 1 AND type = 'expense' AND date BETWEEN '2024-01-15' AND '2024-03-10'
+        GROUP BY category_id
+    """),
+    ("reports: debt payments", """
+        SELECT SUM(amount) FROM expenses
+        WHERE user_id = 1 AND type = 'debt_payment' AND date BETWEEN '2024-01-01' AND '2024-03-31'
+    """),
+    ("reports: rollups", """
+        SELECT category_id, SUM(total_amount) FROM expense_rollups
+        WHERE user_id = 1 AND type = 'expense' AND month BETWEEN '2024-01-01' AND '2024-03-31'
+        GROUP BY category_id
+    """),
+    ("dashboard: recent expenses", """
+        SELECT * FROM expenses WHERE user_id = 1 ORDER BY id DESC LIMIT 5
+    """),
+    ("dashboard: transaction page", """
+        SELECT id, date, amount FROM expenses WHERE user_id = 1 AND id < 1000 ORDER BY id DESC LIMIT 26
+    """),
+    ("dashboard: transaction page, category", """
+        SELECT id, date, amount FROM expenses
+        WHERE user_id = 1 AND category_id = 1 AND id < 1000 ORDER BY id DESC LIMIT 26
+    """),
+    ("dashboard: transaction page, type", """
+        SELECT id, date, amount FROM expenses
+        WHERE user_id = 1 AND type = 'expense' AND id < 1000 ORDER BY id DESC LIMIT 26
+    """),
+    ("dashboard: transaction page, date range", """
+        SELECT id, date, amount FROM expenses
+        WHERE user_id = 1 AND date >= '2024-01-01' AND date <= '2024-03-31'
+          AND (date < '2024-03-15' OR (date = '2024-03-15' AND id < 1000))
+        ORDER BY date DESC, id DESC LIMIT 26
+    """),
+    ("balances: pending expenses", """
+        SELECT * FROM expenses WHERE user_id = 1 AND id > 0 ORDER BY id LIMIT 1000
+    """),
+    ("balances: name to id lookups", resolve_ids_select(
+        "1", "'Food'", "'Groceries'", {name_col: "'x'" for _, _, name_col in ACCOUNT_REFERENCES}
+    )),
+    ("balances: checking update", """
+        UPDATE checking_accounts SET current_balance = current_balance + 0 WHERE id = 1
+    """),
+    ("balances: credit card update", """
+        UPDATE credit_cards SET used_limit = used_limit + 0 WHERE id = 1
+    """),
+    ("balances: splitwise update", """
+        UPDATE splitwise_people SET net_balance = net_balance + 0 WHERE id = 1
+    """),
+]
+
+
+def check_query_plans(engine):
+    # Fails a query when MySQL plans a full scan (type ALL) or no index (key NULL) on any table
+    results = []
+    with engine.connect() as conn:
+        for name, statement in HOT_QUERIES:
+            plan = conn.execute(text("EXPLAIN " + statement)).mappings().fetchall()
+            for row in plan:
+                # table is NULL when MySQL proves no row can match ("Impossible WHERE")
+                ok = row["table"] is None or (row["type"] != "ALL" and row["key"] is not None)
+                results.append({
+                    "query": name,
+                    "table": row["table"],
+                    "type": row["type"],
+                    "key": row["key"],
+                    "ok": ok,
+                })
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.migrations [--check]
+    engine = get_engine()
+    migrate(engine)
+    if "--check" in sys.argv:
+        results = check_query_plans(engine)
+        for r in results:
+            status = "✅" if r["ok"] else "❌"
+            print(f"{status} {r['query']}: table={r['table']} type={r['type']} key={r['key']}")
+        if not all(r["ok"] for r in results):
+            sys.exit(1)
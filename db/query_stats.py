@@ -0,0 +1,122 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger("expense_tracker.sql")
+
+_current_rerun = ContextVar("current_rerun", default=None)
+_current_view = ContextVar("current_view", default=None)
+
+# Result size is estimated from this many rows times the row count
+BYTES_SAMPLE_ROWS = 20
+
+
+def attach_query_stats(engine):
+    # Time every statement at the cursor level so pd.read_sql and conn.execute are both covered
+    if getattr(engine, "_query_stats_attached", False):
+        return engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Nothing to record into and nothing to log: skip the bookkeeping entirely
+        rerun = _current_rerun.get()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if rerun is None and not debug:
+            return
+
+        elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+        # PyMySQL's buffered cursors keep the fetched rows here; other drivers report rowcount
+        rows = getattr(cursor, "_rows", None)
+        count = len(rows) if rows is not None else max(cursor.rowcount, 0)
+        record = {
+            "view": _current_view.get() or "-",
+            "statement": " ".join(statement.split())[:200],
+            "elapsed_ms": round(elapsed_ms, 2),
+            "rows": count,
+            "bytes": _estimate_bytes(rows, count),
+            "executemany": executemany,
+        }
+        if rerun is not None:
+            rerun["statements"].append(record)
+            record["rerun_id"] = rerun["rerun_id"]
+        if debug:
+            logger.debug(json.dumps(record))
+
+    engine._query_stats_attached = True
+    return engine
+
+
+def _estimate_bytes(rows, count):
+    # Average width of the first few rows times the row count, so large results are never walked
+    if not rows:
+        return 0
+    sample = rows[:BYTES_SAMPLE_ROWS]
+    width = sum(
+        len(value) if isinstance(value, (str, bytes)) else 8
+        for row in sample for value in row if value is not None
+    )
+    return round(width * count / len(sample))
+
+
+def start_rerun(label=None):
+    rerun = {
+        "rerun_id": uuid.uuid4().hex[:8],
+        "label": label,
+        "started_at": time.time(),
+        "statements": [],
+        "frames": [],
+    }
+    _current_rerun.set(rerun)
+    return rerun
+
+
+def current_rerun():
+    return _current_rerun.get()
+
+
+@contextmanager
+def view_scope(view):
+    token = _current_view.set(view)
+    try:
+        yield
+    finally:
+        _current_view.reset(token)
+
+
+def summarize_rerun(rerun):
+    by_view = {}
+    for record in rerun["statements"]:
+        view = by_view.setdefault(record["view"], {"queries": 0, "elapsed_ms": 0.0, "rows": 0, "bytes": 0})
+        view["queries"] += 1
+        view["elapsed_ms"] = round(view["elapsed_ms"] + record["elapsed_ms"], 2)
+        view["rows"] += record["rows"]
+        view["bytes"] += record["bytes"]
+
+    return {
+        "rerun_id": rerun["rerun_id"],
+        "label": rerun["label"],
+        "queries": len(rerun["statements"]),
+        "elapsed_ms": round(sum(r["elapsed_ms"] for r in rerun["statements"]), 2),
+        "rows": sum(r["rows"] for r in rerun["statements"]),
+        "bytes": sum(r["bytes"] for r in rerun["statements"]),
+        "frame_bytes": sum(f["bytes"] for f in rerun.get("frames", [])),
+        "views": by_view,
+    }
+
+
+def log_rerun_summary(rerun=None):
+    rerun = rerun or current_rerun()
+    if rerun is None:
+        return None
+    summary = summarize_rerun(rerun)
+    logger.info(json.dumps(summary))
+    return summary
@@ -0,0 +1,53 @@
+import os
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+# Dropdown lookups for the input form, cached per process so widget reruns skip the database.
+# Categories, subcategories and payment methods are shared by every user. The account tables
+# are per user: those lookups take :uid, and the cache key carries it, so each user gets their own copy.
+LOOKUPS = {
+    "categories": "SELECT name FROM categories WHERE type = :t",
+    "subcategories": "SELECT sub_category_name FROM subcategories WHERE category_name = :cat",
+    # The id expenses carry for a category name (see db/expense_ids.py)
+    "category_id": "SELECT MIN(id) FROM categories WHERE name = :name",
+    "splitwise_people": "SELECT name FROM splitwise_people WHERE user_id = :uid",
+    "payment_methods": "SELECT name FROM payment_methods",
+    "credit_cards": "SELECT name FROM credit_cards WHERE user_id = :uid",
+    "checking_accounts": "SELECT name FROM checking_accounts WHERE user_id = :uid",
+}
+
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", 300))
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_reference_values(engine, lookup, params=None):
+    key = (lookup, tuple(sorted((params or {}).items())))
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry and entry[0] > now:
+        return list(entry[1])
+
+    with engine.connect() as conn:
+        df = pd.read_sql(text(LOOKUPS[lookup]), conn, params=params)
+    values = df.iloc[:, 0].tolist()
+
+    with _cache_lock:
+        _cache[key] = (now + REFERENCE_CACHE_TTL, values)
+    return list(values)
+
+
+def invalidate_reference_data(lookup=None, params=None):
+    # Drops every cached copy of the lookup, or only those fetched with these params
+    # (e.g. {"uid": user_id} after adding one user's account)
+    scope = set((params or {}).items())
+    with _cache_lock:
+        for key in list(_cache):
+            if (lookup is None or key[0] == lookup) and scope <= set(key[1]):
+                del _cache[key]
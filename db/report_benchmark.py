@@ -0,0 +1,105 @@
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+from dateutil.relativedelta import relativedelta
+
+from calendar_features import DEFAULT_PERIOD, period_bounds
+from db.report_source import snapshot_queries
+from db.snapshot import SNAPSHOT_SCHEMA
+
+# Times every report query on the pandas and DuckDB snapshot backends over the same table.
+# Peak memory is what Python/numpy allocate (tracemalloc); Arrow and DuckDB buffers are
+# allocated outside it, which is the point: they never become Python objects.
+
+BACKENDS = ["snapshot", "duckdb"]
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Utilities", "Income", ""]
+SUBCATEGORIES = ["Groceries", "Dining", "Salary", "Credit Card Bill", "Splitwise", ""]
+
+
+def synthetic_snapshot(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 5 * 365, rows)
+    # Reference ids start at 1; names are looked up the way the snapshot sync joins them
+    categories = rng.integers(1, len(CATEGORIES) + 1, rows)
+    subcategories = rng.integers(1, len(SUBCATEGORIES) + 1, rows)
+    return pa.table({
+        "id": np.arange(1, rows + 1, dtype=np.int64),
+        "date": pa.array(np.datetime64("2020-01-01") + days.astype("timedelta64[D]"), pa.date32()),
+        "type": rng.choice(["expense", "income", "transfer", "debt_payment"], rows, p=[0.8, 0.05, 0.05, 0.1]),
+        "amount": rng.gamma(2.0, 30.0, rows).round(2),
+        "category_id": categories,
+        "subcategory_id": subcategories,
+        "category": np.array(CATEGORIES)[categories - 1],
+        "subcategory": np.array(SUBCATEGORIES)[subcategories - 1],
+        "paid_to": rng.choice(["Chase", "India Transfer", "Amex", None], rows),
+    }, schema=SNAPSHOT_SCHEMA)
+
+
+def report_calls(queries, table, user_id, today=None):
+    # The same calls show_reports makes on one visit with the default period
+    today = today or date.today()
+    start, end = period_bounds(DEFAULT_PERIOD, today)
+    this_month = date(today.year, today.month, 1)
+    last_month = this_month - relativedelta(months=1)
+    month_end = this_month + relativedelta(months=1, days=-1)
+    category = queries.fetch_category_totals(table, user_id, start, end)
+    return {
+        "monthly": lambda: queries.fetch_monthly_totals(table, user_id, start, end),
+        "daily": lambda: queries.fetch_daily_totals(table, user_id, last_month, month_end),
+        "category": lambda: queries.fetch_category_totals(table, user_id, start, end),
+        "subcategory": lambda: queries.fetch_subcategory_totals(
+            table, user_id, start, end, int(category["category_id"].iloc[0]) if len(category) else 0
+        ),
+        "salary": lambda: queries.fetch_salary_income(table, user_id, start, end),
+        "debt": lambda: queries.fetch_debt_payment_totals(table, user_id, start, end),
+    }
+
+
+def run_benchmark(table, user_id=None, repeat=5, today=None):
+    results = []
+    for backend in BACKENDS:
+        queries = snapshot_queries(backend)
+        for name, call in report_calls(queries, table, user_id, today).items():
+            call()  # warm up
+            timings = []
+            tracemalloc.start()
+            for _ in range(repeat):
+                started = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - started) * 1000)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append({
+                "backend": queries.__name__.split(".")[-1],
+                "query": name,
+                "median_ms": round(float(np.median(timings)), 2),
+                "peak_bytes": peak,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.report_benchmark [user_id | --rows N] [--repeat R]
+    argv = sys.argv[1:]
+    rows = int(argv[argv.index("--rows") + 1]) if "--rows" in argv else None
+    repeat = int(argv[argv.index("--repeat") + 1]) if "--repeat" in argv else 5
+    if rows:
+        user_id, table, today = None, synthetic_snapshot(rows), date(2024, 12, 15)
+    else:
+        from db.connection import get_engine
+        from db.snapshot import sync_snapshot
+
+        user_id, today = int(argv[0]), None
+        table = sync_snapshot(get_engine(), user_id)
+
+    print(f"ℹ️ {table.num_rows:,} rows, {repeat} runs per query")
+    results = run_benchmark(table, user_id, repeat, today)
+    for r in results:
+        print(f"{r['backend']:>16} {r['query']:>12}: {r['median_ms']:>9,.2f} ms  peak {r['peak_bytes']:>13,} bytes")
+    for backend in {r["backend"] for r in results}:
+        total = sum(r["median_ms"] for r in results if r["backend"] == backend)
+        print(f"✅ {backend}: {total:,.1f} ms per report visit")
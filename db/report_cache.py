@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+# Report query results cached per process, keyed by user and data version. The version is
+# the user's latest expense id: any new expense changes it, so a rerun that only moves a
+# widget reuses every result while fresh data is never served stale. Cached frames are
+# shared between sessions and must be treated as read-only.
+
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", 600))
+REPORT_CACHE_ENTRIES = int(os.getenv("REPORT_CACHE_ENTRIES", 1000))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_data_version(engine, user_id):
+    # A point read on the (user_id, id) index
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT COALESCE(MAX(id), 0) FROM expenses WHERE user_id = :uid"), {"uid": user_id}
+        ).scalar()
+
+
+def get_report_data(open_source, user_id, version, name, *args):
+    # open_source comes from lazy_report_source and is only called on a miss.
+    # name is one of the fetch_* report functions; args follow (source, user_id)
+    key = (user_id, open_source.backend, version, name, args)
+    now = time.monotonic()
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    with open_source() as (queries, source):
+        value = getattr(queries, name)(source, user_id, *args)
+
+    with _cache_lock:
+        # Results for this user's older versions can never be hit again
+        for stale in [k for k in _cache if k[0] == user_id and k[2] != version]:
+            del _cache[stale]
+        _cache[key] = (now + REPORT_CACHE_TTL, value)
+        while len(_cache) > REPORT_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return value
+
+
+def invalidate_report_data(user_id=None):
+    with _cache_lock:
+        for key in list(_cache):
+            if user_id is None or key[0] == user_id:
+                del _cache[key]
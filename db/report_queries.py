@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from db.frames import read_frame
+
+# Report aggregates are computed in MySQL so only one row per output bucket crosses the network.
+# Every figure covers a date window; whole-month windows read the expense_rollups table (see rollups.py).
+
+# Totals are grouped by category/subcategory id; names are joined in for display only
+CATEGORY_FILTER = "TRIM(c.name) <> '' AND c.name <> 'Income'"
+
+
+def _window(start_date, end_date):
+    # Every window is inclusive on both ends (date BETWEEN). Whole calendar months are
+    # answered from the monthly rollups; any other range is a range scan on the
+    # (user_id, type, date) index of expenses. Returns (table, amount column, month, predicate);
+    # the columns are qualified with the table alias x.
+    if start_date.day == 1 and (end_date + timedelta(days=1)).day == 1:
+        return "expense_rollups", "x.total_amount", "x.month", "x.month BETWEEN :start AND :end"
+    return "expenses", "x.amount", "DATE_FORMAT(x.date, '%Y-%m-01')", "x.date BETWEEN :start AND :end"
+
+
+def fetch_monthly_totals(conn, user_id, start_date, end_date):
+    table, amount, month, window = _window(start_date, end_date)
+    df = read_frame(
+        conn,
+        text(f"""
+            SELECT {month} AS month, SUM({amount}) AS amount
+            FROM {table} x
+            WHERE x.user_id = :uid AND x.type = 'expense' AND {window}
+            GROUP BY 1
+            ORDER BY 1
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date},
+        label="monthly totals"
+    )
+    df['month'] = pd.to_datetime(df['month']).dt.strftime('%b %Y')
+    return df
+
+
+def fetch_daily_totals(conn, user_id, start_date, end_date):
+    df = read_frame(
+        conn,
+        text("""
+            SELECT date, SUM(amount) AS amount
+            FROM expenses
+            WHERE user_id = :uid AND type = 'expense'
+              AND date BETWEEN :start AND :end
+            GROUP BY date
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date},
+        label="daily totals"
+    )
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def fetch_category_totals(conn, user_id, start_date, end_date):
+    # One row per category id: category_id, category (display name), amount
+    table, amount, _, window = _window(start_date, end_date)
+    return read_frame(
+        conn,
+        text(f"""
+            SELECT c.id AS category_id, c.name AS category, SUM({amount}) AS amount
+            FROM {table} x
+            JOIN categories c ON c.id = x.category_id
+            WHERE x.user_id = :uid AND x.type = 'expense' AND {window} AND {CATEGORY_FILTER}
+            GROUP BY c.id, c.name
+            ORDER BY amount DESC
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date},
+        label="category totals"
+    )
+
+
+def fetch_subcategory_totals(conn, user_id, start_date, end_date, category_id):
+    table, amount, _, window = _window(start_date, end_date)
+    df = read_frame(
+        conn,
+        text(f"""
+            SELECT s.sub_category_name AS subcategory, SUM({amount}) AS amount
+            FROM {table} x
+            JOIN subcategories s ON s.id = x.subcategory_id
+            WHERE x.user_id = :uid AND x.type = 'expense' AND {window}
+              AND x.category_id = :cat AND s.sub_category_name <> ''
+            GROUP BY s.id, s.sub_category_name
+            ORDER BY amount DESC
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date, "cat": category_id},
+        label="subcategory totals"
+    )
+    return df.set_index('subcategory')['amount']
+
+
+def fetch_salary_income(conn, user_id, start_date, end_date):
+    table, amount, _, window = _window(start_date, end_date)
+    total = conn.execute(
+        text(f"""
+            SELECT SUM({amount}) FROM {table} x
+            JOIN subcategories s ON s.id = x.subcategory_id
+            WHERE x.user_id = :uid AND x.type = 'income' AND {window} AND s.sub_category_name = 'Salary'
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date}
+    ).scalar()
+    return float(total or 0)
+
+
+def fetch_debt_payment_totals(conn, user_id, start_date, end_date):
+    row = conn.execute(
+        text("""
+            SELECT
+                SUM(CASE WHEN subcategory LIKE :cc THEN amount ELSE 0 END) AS credit_card,
+                SUM(CASE WHEN subcategory LIKE :sw THEN amount ELSE 0 END) AS splitwise,
+                SUM(CASE WHEN subcategory LIKE :it OR paid_to LIKE :it THEN amount ELSE 0 END) AS india_transfer
+            FROM expenses
+            WHERE user_id = :uid AND type = 'debt_payment' AND date BETWEEN :start AND :end
+        """),
+        {"uid": user_id, "start": start_date, "end": end_date,
+         "cc": "%Credit Card%", "sw": "%Splitwise%", "it": "%India Transfer%"}
+    ).fetchone()
+    return {
+        "credit_card": float(row.credit_card or 0),
+        "splitwise": float(row.splitwise or 0),
+        "india_transfer": float(row.india_transfer or 0),
+    }
+
+
+def fetch_outstanding_balances(conn, user_id):
+    credit_out = conn.execute(
+        text("SELECT SUM(used_limit) FROM credit_cards WHERE user_id = :uid"),
+        {"uid": user_id}
+    ).scalar()
+    splitwise_owe = conn.execute(
+        text("SELECT SUM(net_balance) FROM splitwise_people WHERE user_id = :uid AND net_balance > 0"),
+        {"uid": user_id}
+    ).scalar()
+    return {
+        "credit_cards": float(credit_out or 0),
+        "splitwise": float(splitwise_owe or 0),
+    }
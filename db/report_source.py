@@ -0,0 +1,64 @@
+import os
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import lru_cache
+
+import db.report_queries as report_queries
+
+# Where show_reports reads its aggregates from:
+#   mysql    - aggregate queries against the database (default)
+#   snapshot - the user's local columnar snapshot, synced incrementally on each visit
+#   duckdb   - SQL over that snapshot in DuckDB; falls back to snapshot when not installed.
+#              duckdb is not in requirements.txt: pip install duckdb==0.10.2
+REPORTS_SOURCE = os.getenv("REPORTS_SOURCE", "mysql").lower()
+
+
+@lru_cache(maxsize=None)
+def snapshot_queries(backend):
+    # pyarrow/duckdb are only needed when a snapshot backend is switched on
+    if backend == "duckdb":
+        try:
+            import db.duckdb_reports as duckdb_reports
+            return duckdb_reports
+        except ImportError:
+            print("⚠️ duckdb is not installed, using pandas over the snapshot instead.")
+    import db.snapshot_reports as snapshot_reports
+    return snapshot_reports
+
+
+@contextmanager
+def open_report_source(engine, user_id, backend=None):
+    # Yields (queries, source): a module with the fetch_* report functions and the
+    # first argument to pass them
+    backend = backend or REPORTS_SOURCE
+    if backend in ("snapshot", "duckdb"):
+        from db.snapshot import sync_snapshot
+
+        yield snapshot_queries(backend), sync_snapshot(engine, user_id)
+    else:
+        with engine.connect() as conn:
+            yield report_queries, conn
+
+
+
+@contextmanager
+def lazy_report_source(engine, user_id, backend=None):
+    # Yields open_source(): a context manager over open_report_source's (queries, source).
+    # Nothing is opened until the first call, so a rerun served from the report cache never
+    # connects; later calls in the block share that one connection or snapshot sync.
+    # Called after the block (a fragment rerunning on its own) it opens a source of its own.
+    backend = backend or REPORTS_SOURCE
+    opened, active = [], [True]
+
+    def open_source():
+        if not active:
+            return open_report_source(engine, user_id, backend)
+        if not opened:
+            opened.append(stack.enter_context(open_report_source(engine, user_id, backend)))
+        return nullcontext(opened[0])
+
+    open_source.backend = backend
+    with ExitStack() as stack:
+        try:
+            yield open_source
+        finally:
+            active.clear()
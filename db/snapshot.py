@@ -0,0 +1,159 @@
+import glob
+import os
+import shutil
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import text
+
+# Per-user columnar copy of the expense rows reports read, kept on local disk as Arrow IPC
+# segments named <first id>-<last id>.arrow. Expenses are append-only, so the largest id on
+# disk is the watermark: a sync only pulls rows above it. Segments are memory-mapped on read,
+# so every session in this process (and the OS page cache) shares one copy of the data.
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshots")
+# Part of the snapshot path: bump it with SNAPSHOT_SCHEMA so every user resyncs from scratch
+SNAPSHOT_VERSION = 2
+SNAPSHOT_CHUNK_ROWS = int(os.getenv("SNAPSHOT_CHUNK_ROWS", 100000))
+SNAPSHOT_MAX_SEGMENTS = int(os.getenv("SNAPSHOT_MAX_SEGMENTS", 16))
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("date", pa.date32()),
+    ("type", pa.string()),
+    ("amount", pa.float64()),
+    ("category_id", pa.int64()),
+    ("subcategory_id", pa.int64()),
+    ("category", pa.string()),
+    ("subcategory", pa.string()),
+    ("paid_to", pa.string()),
+])
+
+# Reports group by the ids; names come from the reference tables when the id resolves
+SNAPSHOT_SELECT = """
+    SELECT e.id, e.date, e.type, e.amount, e.category_id, e.subcategory_id,
+           COALESCE(c.name, e.category) AS category,
+           COALESCE(s.sub_category_name, e.subcategory) AS subcategory,
+           e.paid_to
+    FROM expenses e
+    LEFT JOIN categories c ON c.id = e.category_id
+    LEFT JOIN subcategories s ON s.id = e.subcategory_id
+    WHERE e.user_id = :uid AND e.id > :after
+    ORDER BY e.id
+"""
+
+_locks = {}
+_locks_guard = threading.Lock()
+_tables = {}
+
+
+def _user_lock(user_id):
+    with _locks_guard:
+        return _locks.setdefault(user_id, threading.Lock())
+
+
+def snapshot_path(user_id):
+    return os.path.join(SNAPSHOT_DIR, f"v{SNAPSHOT_VERSION}", f"user_{int(user_id)}")
+
+
+def _segments(user_id):
+    return sorted(glob.glob(os.path.join(snapshot_path(user_id), "*.arrow")))
+
+
+def _last_id(segments):
+    if not segments:
+        return 0
+    return int(os.path.basename(segments[-1]).split("-")[1].split(".")[0])
+
+
+def _write_segment(user_id, table):
+    ids = table.column("id")
+    name = f"{ids[0].as_py():012d}-{ids[-1].as_py():012d}.arrow"
+    directory = snapshot_path(user_id)
+    os.makedirs(directory, exist_ok=True)
+    # Write beside the target and rename, so a reader never maps a half-written file
+    tmp = os.path.join(directory, name + ".tmp")
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, SNAPSHOT_SCHEMA) as writer:
+        writer.write_table(table)
+    path = os.path.join(directory, name)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_segments(segments):
+    if not segments:
+        return SNAPSHOT_SCHEMA.empty_table()
+    return pa.concat_tables([pa.ipc.open_file(pa.memory_map(path, "r")).read_all() for path in segments])
+
+
+def _to_arrow(df):
+    df = df.assign(
+        date=pd.to_datetime(df["date"]).dt.date,
+        amount=df["amount"].astype(float),
+        category_id=df["category_id"].astype("Int64"),
+        subcategory_id=df["subcategory_id"].astype("Int64"),
+    )
+    return pa.Table.from_pandas(df, schema=SNAPSHOT_SCHEMA, preserve_index=False)
+
+
+def _compact(user_id, segments):
+    # Many small appends make many files; fold them back into one segment
+    merged = _write_segment(user_id, _read_segments(segments).combine_chunks())
+    for path in segments:
+        if path != merged:
+            os.remove(path)
+
+
+def sync_snapshot(engine, user_id):
+    # Pull rows newer than the snapshot and return the whole (memory-mapped) table
+    with _user_lock(user_id):
+        started = time.perf_counter()
+        after = _last_id(_segments(user_id))
+        added = 0
+        with engine.connect().execution_options(stream_results=True) as conn:
+            chunks = pd.read_sql(
+                text(SNAPSHOT_SELECT),
+                conn,
+                params={"uid": user_id, "after": after},
+                chunksize=SNAPSHOT_CHUNK_ROWS,
+            )
+            for chunk in chunks:
+                if len(chunk):
+                    _write_segment(user_id, _to_arrow(chunk))
+                    added += len(chunk)
+
+        segments = _segments(user_id)
+        if len(segments) > SNAPSHOT_MAX_SEGMENTS:
+            _compact(user_id, segments)
+            segments = _segments(user_id)
+
+        cached = _tables.get(user_id)
+        if cached is None or cached[0] != segments:
+            _tables[user_id] = (segments, _read_segments(segments))
+        table = _tables[user_id][1]
+
+    if added:
+        print(f"✅ Snapshot for user {user_id}: +{added} rows ({table.num_rows} total) "
+              f"in {(time.perf_counter() - started) * 1000:,.0f} ms")
+    return table
+
+
+def drop_snapshot(user_id):
+    with _user_lock(user_id):
+        _tables.pop(user_id, None)
+        shutil.rmtree(snapshot_path(user_id), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # Usage: python -m db.snapshot <user_id> [--rebuild]
+    from db.connection import get_engine
+
+    user_id = int(sys.argv[1])
+    if "--rebuild" in sys.argv:
+        drop_snapshot(user_id)
+    table = sync_snapshot(get_engine(), user_id)
+    print(f"ℹ️ Snapshot for user {user_id}: {table.num_rows} rows, {len(_segments(user_id))} segments, "
+          f"{table.nbytes:,} bytes")
@@ -0,0 +1,89 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# The report_queries functions, answered from a user's local snapshot (db/snapshot.py)
+# instead of MySQL. Same signatures with the snapshot table in place of the connection;
+# rows are filtered in Arrow so only the matching slice is converted to pandas.
+
+
+def _rows(table, tx_type, start_date, end_date):
+    # type = :type AND date BETWEEN :start AND :end
+    def day(value):
+        return pa.scalar(pd.Timestamp(value).date())
+
+    return pc.and_(
+        pc.equal(table["type"], tx_type),
+        pc.and_(pc.greater_equal(table["date"], day(start_date)), pc.less_equal(table["date"], day(end_date))),
+    )
+
+
+def _expenses(table, start_date, end_date, columns=("date", "amount"), categorized=False):
+    mask = _rows(table, "expense", start_date, end_date)
+    if categorized:
+        # Rows with a category id whose name is neither blank nor Income
+        category = pc.fill_null(table["category"], "")
+        mask = pc.and_(mask, pc.and_(pc.is_valid(table["category_id"]), pc.and_(
+            pc.not_equal(pc.utf8_trim_whitespace(category), ""),
+            pc.not_equal(category, "Income"),
+        )))
+    return table.filter(pc.fill_null(mask, False)).select(list(columns)).to_pandas()
+
+
+def fetch_monthly_totals(table, user_id, start_date, end_date):
+    df = _expenses(table, start_date, end_date)
+    months = pd.to_datetime(df["date"]).dt.to_period("M")
+    df = df.groupby(months)["amount"].sum().sort_index().reset_index()
+    df.columns = ["month", "amount"]
+    df["month"] = df["month"].dt.strftime('%b %Y')
+    return df
+
+
+def fetch_daily_totals(table, user_id, start_date, end_date):
+    df = _expenses(table, start_date, end_date).groupby("date", as_index=False)["amount"].sum()
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def fetch_category_totals(table, user_id, start_date, end_date):
+    # Grouped by id; the name is only carried along for display
+    df = _expenses(table, start_date, end_date, columns=("category_id", "category", "amount"), categorized=True)
+    df = df.groupby("category_id", as_index=False).agg(category=("category", "first"), amount=("amount", "sum"))
+    return df.sort_values("amount", ascending=False, ignore_index=True)
+
+
+def fetch_subcategory_totals(table, user_id, start_date, end_date, category_id):
+    df = _expenses(
+        table, start_date, end_date, columns=("category_id", "subcategory_id", "subcategory", "amount")
+    )
+    df = df[(df["category_id"] == category_id) & df["subcategory_id"].notna() & df["subcategory"].fillna("").ne("")]
+    df = df.groupby("subcategory_id").agg(subcategory=("subcategory", "first"), amount=("amount", "sum"))
+    return df.set_index("subcategory")["amount"].sort_values(ascending=False)
+
+
+def fetch_salary_income(table, user_id, start_date, end_date):
+    mask = pc.and_(
+        _rows(table, "income", start_date, end_date),
+        pc.and_(pc.is_valid(table["subcategory_id"]), pc.equal(table["subcategory"], "Salary")),
+    )
+    return float(pc.sum(table.filter(pc.fill_null(mask, False))["amount"]).as_py() or 0)
+
+
+def fetch_debt_payment_totals(table, user_id, start_date, end_date):
+    debt = table.filter(_rows(table, "debt_payment", start_date, end_date))
+
+    def total(mask):
+        # LIKE '%...%' in MySQL is case-insensitive; NULL never matches
+        return float(pc.sum(debt.filter(pc.fill_null(mask, False))["amount"]).as_py() or 0)
+
+    def contains(column, pattern):
+        return pc.match_substring(debt[column], pattern, ignore_case=True)
+
+    return {
+        "credit_card": total(contains("subcategory", "Credit Card")),
+        "splitwise": total(contains("subcategory", "Splitwise")),
+        "india_transfer": total(pc.or_(
+            pc.fill_null(contains("subcategory", "India Transfer"), False),
+            pc.fill_null(contains("paid_to", "India Transfer"), False),
+        )),
+    }
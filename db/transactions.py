@@ -0,0 +1,60 @@
+from sqlalchemy import text
+
+from db.frames import read_frame
+
+TRANSACTION_COLUMNS = [
+    "id", "date", "type", "amount", "category", "subcategory",
+    "payment_method", "paid_to", "description",
+]
+
+# Equality filters are served by the (user_id, <column>, id) indexes of migration 9
+FILTER_CLAUSES = {
+    "type": "type = :type",
+    "category_id": "category_id = :category_id",
+    "start_date": "date >= :start_date",
+    "end_date": "date <= :end_date",
+    "payment_method": "payment_method = :payment_method",
+}
+
+
+def fetch_transactions_page(conn, user_id, filters=None, before=None, page_size=25):
+    # Keyset pagination, newest first: cost is the same for page 1 and page 10,000.
+    # Pages walk (user_id, id); with a date range they walk (user_id, date, id) instead,
+    # so the range is a seek on the date index rather than a scan back through later ids.
+    # before is the cursor returned with the previous page: an id, or a (date, id) pair.
+    filters = filters or {}
+    by_date = bool(filters.get("start_date") or filters.get("end_date"))
+    clauses = ["user_id = :uid"]
+    params = {"uid": user_id, "limit": page_size + 1}
+
+    for key, value in filters.items():
+        if value:
+            clauses.append(FILTER_CLAUSES[key])
+            params[key] = value
+    if before and by_date:
+        clauses.append("(date < :before_date OR (date = :before_date AND id < :before_id))")
+        params["before_date"], params["before_id"] = before
+    elif before:
+        clauses.append("id < :before_id")
+        params["before_id"] = before
+
+    df = read_frame(
+        conn,
+        text(f"""
+            SELECT {", ".join(TRANSACTION_COLUMNS)}
+            FROM expenses
+            WHERE {" AND ".join(clauses)}
+            ORDER BY {"date DESC, id DESC" if by_date else "id DESC"}
+            LIMIT :limit
+        """),
+        params,
+        label="transactions page"
+    )
+
+    has_more = len(df) > page_size
+    df = df.head(page_size)
+    next_before = None
+    if has_more:
+        last = df.iloc[-1]
+        next_before = (last["date"], int(last["id"])) if by_date else int(last["id"])
+    return df, next_before
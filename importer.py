@@ -0,0 +1,315 @@
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import text, bindparam
+
+from db.expense_ids import ACCOUNT_REFERENCES, EXPENSE_ID_COLUMNS
+from ledger import INSERT_EXPENSE
+from process_expenses import balance_deltas, apply_balance_deltas, apply_pending_expenses, advance_watermark
+from rollups import apply_rollup_deltas
+
+EXPENSE_COLUMNS = [
+    "date", "type", "amount", "payment_method", "used_credit_card", "paid_to",
+    "category", "subcategory", "is_splitwise", "splitwise_person", "description",
+]
+
+EXPENSE_TYPES = ["expense", "income", "transfer", "debt_payment"]
+
+NAME_COLUMNS = ["payment_method", "used_credit_card", "paid_to", "category", "subcategory", "splitwise_person"]
+
+
+def normalize_expenses(df, user_id):
+    df = df.copy()
+    df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
+    for col in EXPENSE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    df = df[EXPENSE_COLUMNS]
+    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").astype(float)
+    df["type"] = df["type"].astype(str).str.strip().str.lower()
+    for col in NAME_COLUMNS:
+        # object first: where() on an all-blank (float64) column would put NaN back, not None
+        df[col] = df[col].astype(object).where(df[col].notna(), None).map(lambda v: str(v).strip() if v is not None else None)
+    df["is_splitwise"] = df["is_splitwise"].astype(str).str.strip().str.lower().map(
+        lambda v: "Yes" if v in ("yes", "true", "1") else "No"
+    )
+    df["description"] = df["description"].fillna("")
+    df["user_id"] = user_id
+    return df
+
+
+def validate_expenses(df):
+    valid = df["date"].notna() & df["amount"].notna() & df["type"].isin(EXPENSE_TYPES)
+    return df[valid], int((~valid).sum())
+
+
+def add_fingerprints(df, seen=None):
+    # sha1(user, date, amount, normalized description, source account, occurrence).
+    # The occurrence number keeps two genuinely identical rows in one statement distinct,
+    # while re-importing the same statement reproduces the same fingerprints.
+    # seen carries the counts from one batch of an import to the next, per date. Statements
+    # are date-ordered (either direction), so a row can only repeat one from an earlier batch
+    # on the date that batch ended with: only that date is kept, one day's rows at most.
+    seen = {} if seen is None else seen
+    card = df["used_credit_card"].fillna("")
+    source = card.where(card != "", df["payment_method"].fillna(""))
+    description = df["description"].fillna("").map(lambda d: re.sub(r"\s+", " ", str(d)).strip().lower())
+
+    fingerprints = []
+    for user_id, date, amount, desc, account in zip(df["user_id"], df["date"], df["amount"], description, source):
+        base = f"{user_id}|{date.isoformat()}|{amount:.2f}|{desc}|{account.lower()}"
+        counts = seen.setdefault(date, {})
+        occurrence = counts.get(base, 0)
+        counts[base] = occurrence + 1
+        fingerprints.append(hashlib.sha1(f"{base}|{occurrence}".encode()).hexdigest())
+
+    if len(df):
+        trailing = df["date"].iloc[-1]
+        for day in [day for day in seen if day != trailing]:
+            del seen[day]
+
+    df = df.copy()
+    df["fingerprint"] = fingerprints
+    return df
+
+
+def drop_known_fingerprints(conn, user_id, df):
+    # Anti-join against the unique (user_id, fingerprint) index: one query per batch
+    known = conn.execute(
+        text("SELECT fingerprint FROM expenses WHERE user_id = :uid AND fingerprint IN :fps")
+        .bindparams(bindparam("fps", expanding=True)),
+        {"uid": user_id, "fps": df["fingerprint"].tolist()}
+    ).scalars().all()
+    return df[~df["fingerprint"].isin(known)]
+
+
+def iter_csv_batches(source, batch_size):
+    yield from pd.read_csv(source, chunksize=batch_size)
+
+
+def iter_xlsx_batches(source, batch_size):
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(col) for col in next(rows, [])]
+        batch = []
+        for row in rows:
+            if any(value is not None for value in row):
+                batch.append(row)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_statement_batches(source, batch_size=5000, filename=None):
+    name = (filename or str(source)).lower()
+    if name.endswith(".csv"):
+        return iter_csv_batches(source, batch_size)
+    if name.endswith((".xlsx", ".xlsm")):
+        return iter_xlsx_batches(source, batch_size)
+    raise ValueError(f"Unsupported statement file: {os.path.basename(name)}")
+
+
+def load_reference_ids(conn, user_id):
+    # Every lookup table the importer needs, read once per import
+    refs = {
+        "categories": pd.read_sql(text("SELECT id, name FROM categories"), conn),
+        "subcategories": pd.read_sql(
+            text("SELECT id, category_name, sub_category_name FROM subcategories"), conn
+        ),
+    }
+    for table in {table for _, table, _ in ACCOUNT_REFERENCES}:
+        refs[table] = pd.read_sql(
+            text(f"SELECT id, name FROM {table} WHERE user_id = :uid"), conn, params={"uid": user_id}
+        )
+    return refs
+
+
+def _name_key(values):
+    # Names compare the way MySQL's _ci collations do: ignoring case and trailing spaces
+    return values.astype("string").str.strip().str.casefold()
+
+
+def _merge_ids(df, ref, id_col, on):
+    # on: {expense column: reference column}. Collation-equal names resolve to their
+    # MIN(id), like the SQL-side lookups in db/expense_ids.py
+    keys = [f"_{col}_key" for col in on]
+    left = df.assign(**{key: _name_key(df[col]) for key, col in zip(keys, on)})
+    right = (
+        ref.assign(**{key: _name_key(ref[col]) for key, col in zip(keys, on.values())})
+        .dropna(subset=keys)
+        .sort_values("id")
+        .drop_duplicates(keys)
+    )
+    right = right[keys + ["id"]].rename(columns={"id": id_col})
+    return left.merge(right, on=keys, how="left").drop(columns=keys)
+
+
+def resolve_reference_ids(df, refs):
+    # Vectorized left joins instead of one lookup query per row
+    df = _merge_ids(df, refs["categories"], "category_id", {"category": "name"})
+    df = _merge_ids(df, refs["subcategories"], "subcategory_id", {
+        "category": "category_name", "subcategory": "sub_category_name"
+    })
+    for id_col, table, name_col in ACCOUNT_REFERENCES:
+        df = _merge_ids(df, refs[table], id_col, {name_col: "name"})
+    for id_col in EXPENSE_ID_COLUMNS:
+        df[id_col] = df[id_col].astype("Int64")
+    return df
+
+
+def insert_expense_batch(conn, user_id, df):
+    # One multi-row INSERT, one rollup upsert and one UPDATE per touched account for the whole batch
+    apply_pending_expenses(conn, user_id)
+    df = drop_known_fingerprints(conn, user_id, df)
+    if df.empty:
+        return 0
+
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    conn.execute(INSERT_EXPENSE, records)
+    apply_balance_deltas(conn, [delta for r in records for delta in balance_deltas(r)])
+
+    months = pd.to_datetime(df["date"]).dt.to_period("M").dt.start_time.dt.date
+    rollups = (
+        df.assign(month=months, cat_id=df["category_id"].fillna(0), subcat_id=df["subcategory_id"].fillna(0))
+        .groupby(["user_id", "month", "type", "cat_id", "subcat_id"])["amount"]
+        .agg(["sum", "count"])
+        .reset_index()
+        .rename(columns={"sum": "amt", "count": "cnt"})
+    )
+    apply_rollup_deltas(conn, rollups.astype(object).to_dict("records"))
+
+    # The watermark lock keeps other ledger writers for this user out, so this is our last row
+    last_id = conn.execute(
+        text("SELECT MAX(id) FROM expenses WHERE user_id = :user_id"), {"user_id": user_id}
+    ).scalar()
+    advance_watermark(conn, user_id, last_id)
+    return len(records)
+
+
+def import_expense_batches(engine, batches, user_id, progress=None):
+    # Each batch is normalized, validated and committed before the next one is read,
+    # so memory stays at one batch no matter how large the source file is
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        refs = load_reference_ids(conn, user_id)
+
+    inserted = rejected = duplicates = 0
+    seen = {}
+    for batch in batches:
+        df, bad_rows = validate_expenses(normalize_expenses(batch, user_id))
+        rejected += bad_rows
+        if len(df):
+            df = resolve_reference_ids(add_fingerprints(df, seen), refs)
+            with engine.begin() as conn:
+                batch_inserted = insert_expense_batch(conn, user_id, df)
+            inserted += batch_inserted
+            duplicates += len(df) - batch_inserted
+        if progress:
+            progress(inserted, rejected)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "rows": inserted,
+        "rejected": rejected,
+        "duplicates": duplicates,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed else None,
+    }
+    print(f"✅ Imported {inserted} expenses: {report}")
+    return report
+
+
+def import_expenses(engine, df, user_id, chunk_size=5000):
+    batches = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    return import_expense_batches(engine, batches, user_id)
+
+
+def import_statement_file(engine, source, user_id, batch_size=5000, filename=None, progress=None):
+    batches = iter_statement_batches(source, batch_size, filename)
+    return import_expense_batches(engine, batches, user_id, progress)
+
+
+def parse_statement_file(path, user_id, spool_dir, batch_size=5000):
+    # Runs in a worker process: parsing and normalizing is the CPU-heavy part of an import.
+    # Each normalized batch is spooled to its own pickle in spool_dir and only the file names
+    # come back, so neither the worker nor the parent ever holds a whole statement.
+    try:
+        batches, rejected, seen = [], 0, {}
+        for batch in iter_statement_batches(path, batch_size):
+            df, bad_rows = validate_expenses(normalize_expenses(batch, user_id))
+            rejected += bad_rows
+            if len(df):
+                fd, spool = tempfile.mkstemp(suffix=".pkl", dir=spool_dir)
+                os.close(fd)
+                add_fingerprints(df, seen).to_pickle(spool)
+                batches.append(spool)
+        return {"path": path, "batches": batches, "rejected": rejected, "error": None}
+    except Exception as e:
+        return {"path": path, "batches": [], "rejected": 0, "error": str(e)}
+
+
+def expand_statement_paths(target):
+    if os.path.isdir(target):
+        target = os.path.join(target, "*")
+    return sorted(
+        path for path in glob.glob(target)
+        if path.lower().endswith((".csv", ".xlsx", ".xlsm"))
+    )
+
+
+def import_statement_files(engine, paths, user_id, workers=None, chunk_size=5000):
+    # Workers parse in parallel; this process is the only writer, so inserts never contend
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        refs = load_reference_ids(conn, user_id)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="statement-import-") as spool_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(parse_statement_file, path, user_id, spool_dir, chunk_size): path for path in paths
+        }
+        for future in as_completed(list(futures)):
+            # Drop our reference as soon as the result is read; only batch file names are held
+            futures.pop(future)
+            parsed = future.result()
+            result = {
+                "path": parsed["path"], "rows": 0, "duplicates": 0,
+                "rejected": parsed["rejected"], "error": parsed["error"],
+            }
+            try:
+                for spool in parsed["batches"]:
+                    df = resolve_reference_ids(pd.read_pickle(spool), refs)
+                    os.remove(spool)
+                    with engine.begin() as conn:
+                        inserted = insert_expense_batch(conn, user_id, df)
+                    result["rows"] += inserted
+                    result["duplicates"] += len(df) - inserted
+            except Exception as e:
+                result["error"] = str(e)
+
+            status = "✅" if result["error"] is None else "❌"
+            print(f"{status} {os.path.basename(result['path'])}: {result['rows']} rows, "
+                  f"{result['duplicates']} duplicates, {result['rejected']} rejected{' — ' + result['error'] if result['error'] else ''}")
+            results.append(result)
+
+    elapsed = time.perf_counter() - started
+    total = sum(r["rows"] for r in results)
+    print(f"✅ Imported {total} expenses from {len(results)} files in {elapsed:,.1f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} rows/s)")
+    return results
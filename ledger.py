@@ -0,0 +1,46 @@
+from sqlalchemy import text
+from db.expense_ids import resolve_expense_ids
+from process_expenses import balance_deltas, apply_balance_deltas, apply_pending_expenses, advance_watermark
+from rollups import apply_expense_to_rollups
+
+INSERT_EXPENSE = text("""
+    INSERT INTO expenses (
+        date, type, amount, payment_method,
+        used_credit_card, paid_to,
+        category, subcategory,
+        is_splitwise, splitwise_person, description,
+        user_id, category_id, subcategory_id,
+        payment_account_id, credit_card_id, paid_to_account_id,
+        paid_to_card_id, splitwise_person_id, fingerprint
+    )
+    VALUES (
+        :date, :type, :amount, :payment_method,
+        :used_credit_card, :paid_to, :category, :subcategory,
+        :is_splitwise, :splitwise_person, :description,
+        :user_id, :category_id, :subcategory_id,
+        :payment_account_id, :credit_card_id, :paid_to_account_id,
+        :paid_to_card_id, :splitwise_person_id, :fingerprint
+    )
+""")
+
+
+def record_expense(engine, expense):
+    # Insert, balance deltas, rollups and watermark all commit together on one connection
+    user_id = expense["user_id"]
+
+    with engine.begin() as conn:
+        # Locks the user's watermark; applies anything a crashed writer left behind (normally nothing)
+        apply_pending_expenses(conn, user_id)
+
+        # Names are resolved once here; balance updates then target the ids
+        expense = {"fingerprint": None, **expense, **resolve_expense_ids(conn, expense)}
+        expense_id = conn.execute(INSERT_EXPENSE, expense).lastrowid
+
+        apply_balance_deltas(conn, balance_deltas(expense))
+        apply_expense_to_rollups(
+            conn, user_id, expense["date"], expense["type"],
+            expense["category_id"], expense["subcategory_id"], expense["amount"]
+        )
+        advance_watermark(conn, user_id, expense_id)
+
+    return expense_id
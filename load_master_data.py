@@ -1,92 +1,202 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 from sqlalchemy import text
 from db.connection import get_engine
 
-engine = get_engine()
+# One entry per master table, loaded in this order (subcategories need category ids).
+# "columns" maps the sheet column to the table column; "update" lists the columns an
+# existing row may be corrected to. Live balances are never overwritten: opening
+# balances only apply to rows that are new.
+MASTER_TABLES = [
+    {
+        "table": "categories",
+        "file": "categories.xlsx",
+        "columns": {"name": "name"},
+        "key": ["name"],
+        "update": [],
+        "per_user": False,
+    },
+    {
+        "table": "subcategories",
+        "file": "subcategories.xlsx",
+        "columns": {"category_name": "category_name", "sub_category_name": "sub_category_name"},
+        "key": ["category_name", "sub_category_name"],
+        "update": ["category_id"],
+        "per_user": False,
+    },
+    {
+        "table": "payment_methods",
+        "file": "payment_methods.xlsx",
+        "columns": {"payment_methods": "name"},
+        "key": ["name"],
+        "update": [],
+        "per_user": False,
+    },
+    {
+        "table": "credit_cards",
+        "file": "credit_cards.xlsx",
+        "columns": {"name": "name", "total_limit": "total_limit", "used_limit": "used_limit"},
+        "key": ["name"],
+        "update": ["total_limit"],
+        "per_user": True,
+    },
+    {
+        "table": "checking_accounts",
+        "file": "checking_accounts.xlsx",
+        "columns": {"name": "name", "current_balance": "current_balance"},
+        "key": ["name"],
+        "update": [],
+        "per_user": True,
+    },
+    {
+        "table": "splitwise_people",
+        "file": "splitwise_people.xlsx",
+        "columns": {"name": "name", "net_balance": "net_balance"},
+        "key": ["name"],
+        "update": [],
+        "per_user": True,
+    },
+]
 
-def insert_categories():
-    df = pd.read_excel("data/categories.xlsx")
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("INSERT IGNORE INTO categories (name) VALUES (:name)"),
-                {"name": row["name"].strip()}
-            )
-
-def insert_subcategories():
-    df = pd.read_excel("data/subcategories.xlsx")
+
+def read_master_file(spec, data_dir="data"):
+    df = pd.read_excel(os.path.join(data_dir, spec["file"]))
+    df = df[list(spec["columns"])].rename(columns=spec["columns"])
+    for col in df.columns:
+        if df[col].dtype == object:
+            # Blank cells stay NULL rather than becoming the string 'nan'
+            df[col] = df[col].astype(str).str.strip().where(df[col].notna(), None)
+    keys = pd.DataFrame({k: df[k].map(_name_key) for k in spec["key"]})
+    return df[~keys.duplicated(keep="last")]
+
+
+def read_master_frames(data_dir="data", workers=None):
+    # Workbooks are independent to parse, so each one gets its own worker process.
+    # Only the writes depend on each other (subcategories need category ids), and
+    # load_master_data applies those in MASTER_TABLES order on one connection.
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or len(MASTER_TABLES)) as pool:
+        futures = {spec["table"]: pool.submit(read_master_file, spec, data_dir) for spec in MASTER_TABLES}
+        frames = {table: future.result() for table, future in futures.items()}
+    print(f"📄 Parsed {len(frames)} workbooks in {time.perf_counter() - started:,.2f}s")
+    return frames
+
+
+def _name_key(value):
+    # Names compare the way MySQL's _ci collations do: ignoring case and trailing spaces
+    return str(value).strip().casefold() if value is not None and not pd.isna(value) else None
+
+
+def _same(a, b):
+    if isinstance(a, (int, float)) or isinstance(b, (int, float)):
+        try:
+            return round(float(a), 2) == round(float(b), 2)
+        except (TypeError, ValueError):
+            return False
+    return a == b
+
+
+def diff_table(spec, incoming, existing):
+    # Split sheet rows into new, changed and unchanged against the rows already stored
+    key = spec["key"]
+    stored = {}
+    for row in existing:
+        # existing is ordered by id, so collation-equal duplicates resolve to the lowest id
+        stored.setdefault(tuple(_name_key(row[k]) for k in key), row)
+    inserts, updates, unchanged = [], [], 0
+
+    for row in incoming.astype(object).where(incoming.notna(), None).to_dict("records"):
+        current = stored.get(tuple(_name_key(row[k]) for k in key))
+        if current is None:
+            inserts.append(row)
+        elif any(not _same(row.get(col), current[col]) for col in spec["update"]):
+            updates.append({**row, "id": current["id"]})
+        else:
+            unchanged += 1
+    return inserts, updates, unchanged
+
+
+def _load_existing(conn, spec, user_id):
+    columns = ", ".join(["id"] + spec["key"] + spec["update"])
+    query = f"SELECT {columns} FROM {spec['table']}"
+    params = {}
+    if spec["per_user"]:
+        query += " WHERE user_id <=> :user_id"
+        params = {"user_id": user_id}
+    query += " ORDER BY id"
+    return [dict(row) for row in conn.execute(text(query), params).mappings()]
+
+
+def _write_table(conn, spec, inserts, updates, user_id):
+    table = spec["table"]
+    if inserts:
+        columns = list(inserts[0]) + (["user_id"] if spec["per_user"] else [])
+        rows = [{**row, "user_id": user_id} for row in inserts] if spec["per_user"] else inserts
+        conn.execute(
+            text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+            rows
+        )
+    if updates:
+        assignments = ", ".join(f"{col} = :{col}" for col in spec["update"])
+        conn.execute(text(f"UPDATE {table} SET {assignments} WHERE id = :id"), updates)
+
+
+def load_master_data(engine, frames, user_id=None, dry_run=False):
+    counts = {}
+    # One transaction for every table: a failure leaves the master data untouched.
+    # A dry run reads and diffs exactly the same way but writes nothing.
     with engine.begin() as conn:
-        for _, row in df.iterrows():
-            result = conn.execute(
-                text("SELECT id FROM categories WHERE name = :name"),
-                {"name": row["category_name"].strip()}
-            ).fetchone()
-            if result:
-                conn.execute(
-                    text("INSERT IGNORE INTO subcategories (category_id, name) VALUES (:cat_id, :subname)"),
-                    {"cat_id": result.id, "subname": row["sub_category_name"].strip()}
+        category_ids = {}
+        for spec in MASTER_TABLES:
+            incoming = frames[spec["table"]]
+            if spec["table"] == "subcategories":
+                incoming = incoming.assign(
+                    category_id=incoming["category_name"].map(_name_key).map(category_ids)
                 )
 
-def insert_payment_methods():
-    df = pd.read_excel("data/payment_methods.xlsx")
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("INSERT IGNORE INTO payment_methods (name) VALUES (:name)"),
-                {"name": row["payment_methods"].strip()}
-            )
-
-def insert_credit_cards():
-    df = pd.read_excel("data/credit_cards.xlsx")
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("""
-                    INSERT IGNORE INTO credit_cards (name, total_limit, used_limit)
-                    VALUES (:name, :total_limit, :used_limit)
-                """),
-                {
-                    "name": row["name"].strip(),
-                    "total_limit": row["total_limit"],
-                    "used_limit": row["used_limit"]
-                }
-            )
+            inserts, updates, unchanged = diff_table(spec, incoming, _load_existing(conn, spec, user_id))
+            counts[spec["table"]] = {"inserted": len(inserts), "updated": len(updates), "unchanged": unchanged}
 
-def insert_checking_accounts():
-    df = pd.read_excel("data/checking_accounts.xlsx")
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("""
-                    INSERT IGNORE INTO checking_accounts (name, current_balance)
-                    VALUES (:name, :current_balance)
-                """),
-                {
-                    "name": row["name"].strip(),
-                    "current_balance": row["current_balance"]
-                }
-            )
+            if dry_run:
+                for row in inserts:
+                    print(f"  + {spec['table']}: {row}")
+                for row in updates:
+                    print(f"  ~ {spec['table']}: {row}")
+            else:
+                _write_table(conn, spec, inserts, updates, user_id)
 
-def insert_splitwise_people():
-    df = pd.read_excel("data/splitwise_people.xlsx")
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("""
-                    INSERT IGNORE INTO splitwise_people (name, net_balance)
-                    VALUES (:name, :net_balance)
-                """),
-                {
-                    "name": row["name"].strip(),
-                    "net_balance": row["net_balance"]
+            if spec["table"] == "categories":
+                # Name → id for every category, including the ones just inserted
+                category_ids = {
+                    _name_key(row.name): row.id
+                    for row in conn.execute(text("SELECT MIN(id) AS id, name FROM categories GROUP BY name"))
                 }
-            )
+
+    for table, c in counts.items():
+        print(f"{'🔎' if dry_run else '✅'} {table}: {c['inserted']} inserted, "
+              f"{c['updated']} updated, {c['unchanged']} unchanged")
+    return counts
+
 
 if __name__ == "__main__":
-    insert_categories()
-    insert_subcategories()
-    insert_payment_methods()
-    insert_credit_cards()
-    insert_checking_accounts()
-    insert_splitwise_people()
-    print(" All master data loaded successfully.")
+    # Usage: python load_master_data.py [user_id] [--dry-run] [--workers N]
+    argv = sys.argv[1:]
+    workers = None
+    if "--workers" in argv:
+        i = argv.index("--workers")
+        workers = int(argv[i + 1])
+        argv = argv[:i] + argv[i + 2:]
+    args = [a for a in argv if not a.startswith("--")]
+    dry_run = "--dry-run" in argv
+    load_master_data(
+        get_engine(),
+        read_master_frames(workers=workers),
+        user_id=int(args[0]) if args else None,
+        dry_run=dry_run,
+    )
+    if not dry_run:
+        print(" All master data loaded successfully.")
@@ -1,115 +1,282 @@
+import time
 from sqlalchemy import text
 from db.connection import get_engine
+from db.migrations import CREATE_WATERMARK_TABLE
+from db.expense_ids import resolved_id_columns
 
-def update_balances_from_expenses(engine, last_id=None):
-    query = "SELECT * FROM expenses"
+BALANCE_COLUMNS = {
+    "checking_accounts": "current_balance",
+    "credit_cards": "used_limit",
+    "splitwise_people": "net_balance",
+}
+
+# Net balance change per account id for every expense above the user's watermark.
+# Each leg mirrors one branch of balance_deltas.
+BALANCE_DELTAS_QUERY = """
+    SELECT tbl, account_id, SUM(delta) AS delta
+    FROM (
+        SELECT 'checking_accounts' AS tbl, payment_account_id AS account_id,
+               CASE
+                   WHEN type = 'income' THEN amount
+                   WHEN type = 'expense' AND NOT (sw AND has_person) AND NOT has_card THEN -ABS(amount)
+                   WHEN type = 'transfer' AND NOT sw THEN -ABS(amount)
+                   WHEN type = 'debt_payment' THEN -ABS(amount)
+                   ELSE 0
+               END AS delta
+        FROM flagged WHERE payment_account_id IS NOT NULL
+
+        UNION ALL
+        SELECT 'checking_accounts', paid_to_account_id, ABS(amount)
+        FROM flagged WHERE type = 'transfer' AND NOT sw AND paid_to_account_id IS NOT NULL
+
+        UNION ALL
+        SELECT 'credit_cards', credit_card_id, ABS(amount)
+        FROM flagged WHERE type = 'expense' AND NOT (sw AND has_person) AND credit_card_id IS NOT NULL
+
+        UNION ALL
+        SELECT 'credit_cards', paid_to_card_id, -ABS(amount)
+        FROM flagged WHERE type = 'debt_payment' AND paid_to_card_id IS NOT NULL
+
+        UNION ALL
+        SELECT 'splitwise_people', splitwise_person_id,
+               CASE type WHEN 'income' THEN amount WHEN 'expense' THEN -amount ELSE -ABS(amount) END
+        FROM flagged
+        WHERE sw AND has_person AND splitwise_person_id IS NOT NULL
+          AND type IN ('income', 'expense', 'debt_payment')
+    ) legs
+    GROUP BY tbl, account_id
+    HAVING SUM(delta) <> 0
+"""
+
+FLAGGED_EXPENSES = f"""
+    WITH flagged AS (
+        SELECT e.type, e.amount,
+               COALESCE(e.used_credit_card, '') <> '' AS has_card,
+               COALESCE(LOWER(e.is_splitwise), '') = 'yes' AS sw,
+               COALESCE(e.splitwise_person, '') <> '' AS has_person,
+               {resolved_id_columns("e")}
+        FROM expenses e
+        LEFT JOIN balance_watermarks w ON w.user_id = e.user_id
+        WHERE e.id > COALESCE(w.last_applied_id, 0) AND e.id <= :upto
+    )
+"""
+
+
+def rebuild_balances_from_expenses(engine, full=False):
+    # Set-based catch-up of every user's pending expenses. full=True zeroes every balance
+    # and replays the whole ledger instead; opening balances that were never entered as
+    # expenses are lost by that, so it is only for a deliberate rebuild.
+    ensure_watermark_table(engine)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if full:
+            for table, column in BALANCE_COLUMNS.items():
+                conn.execute(text(f"UPDATE {table} SET {column} = 0"))
+            conn.execute(text("UPDATE balance_watermarks SET last_applied_id = 0"))
+        # A user without a watermark predates it: the old per-row code already applied
+        # all of their expenses, so they start at their latest id (0 only on a full rebuild)
+        conn.execute(text(f"""
+            INSERT IGNORE INTO balance_watermarks (user_id, last_applied_id)
+            SELECT user_id, {"0" if full else "MAX(id)"} FROM expenses GROUP BY user_id
+        """))
+        conn.execute(text("SELECT user_id FROM balance_watermarks FOR UPDATE")).fetchall()
+        upto = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM expenses")).scalar()
+
+        deltas = conn.execute(text(FLAGGED_EXPENSES + BALANCE_DELTAS_QUERY), {"upto": upto}).fetchall()
+        computed = time.perf_counter()
+
+        apply_balance_deltas(conn, [(d.tbl, d.account_id, float(d.delta)) for d in deltas])
+
+        conn.execute(text("""
+            UPDATE balance_watermarks w
+            JOIN (
+                SELECT user_id, MAX(id) AS max_id FROM expenses WHERE id <= :upto GROUP BY user_id
+            ) applied ON applied.user_id = w.user_id
+            SET w.last_applied_id = applied.max_id
+            WHERE applied.max_id > w.last_applied_id
+        """), {"upto": upto})
+    finished = time.perf_counter()
+
+    report = {
+        "accounts_updated": len(deltas),
+        "compute_ms": round((computed - started) * 1000, 1),
+        "apply_ms": round((finished - computed) * 1000, 1),
+        "total_ms": round((finished - started) * 1000, 1),
+    }
+    print(f"✅ All balances rebuilt: {report}")
+    return report
+
+
+def balance_deltas(r):
+    # (table, account id, signed change) for one expense row or in-memory expense dict.
+    # Branching follows the names as entered; the update targets the resolved ids.
+    amount = float(r["amount"])
+    tx_type = r["type"]
+    method = r["payment_method"]
+    credit_card = r["used_credit_card"]
+    paid_to = r["paid_to"]
+    is_splitwise = str(r["is_splitwise"]).lower() == "yes"
+    person = r["splitwise_person"]
+    deltas = []
+
+    # ========== INCOME ==========
+    if tx_type == "income":
+        if method:
+            deltas.append(("checking_accounts", r["payment_account_id"], amount))
+        if is_splitwise and person:
+            # they paid me → reduce what they owe me
+            deltas.append(("splitwise_people", r["splitwise_person_id"], amount))
+
+    # ========== EXPENSE ==========
+    elif tx_type == "expense":
+        if is_splitwise and person:
+            sign = -1 if amount > 0 else 1
+            deltas.append(("splitwise_people", r["splitwise_person_id"], sign * abs(amount)))
+        else:
+            if credit_card:
+                deltas.append(("credit_cards", r["credit_card_id"], abs(amount)))
+            elif method:
+                deltas.append(("checking_accounts", r["payment_account_id"], -abs(amount)))
+
+    # ========== TRANSFER ==========
+    elif tx_type == "transfer":
+        if is_splitwise:
+            return deltas
+        if method:
+            deltas.append(("checking_accounts", r["payment_account_id"], -abs(amount)))
+        if paid_to:
+            deltas.append(("checking_accounts", r["paid_to_account_id"], abs(amount)))
+
+    # ========== DEBT PAYMENT ==========
+    elif tx_type == "debt_payment":
+        if method:
+            deltas.append(("checking_accounts", r["payment_account_id"], -abs(amount)))
+        if paid_to:
+            # paid_to_card_id is only set when paid_to is one of the user's credit cards
+            deltas.append(("credit_cards", r["paid_to_card_id"], -abs(amount)))
+        if is_splitwise and person:
+            deltas.append(("splitwise_people", r["splitwise_person_id"], -abs(amount)))
+
+    # A name that matches no account of the user has no id and, as before, changes nothing
+    return [d for d in deltas if d[1] is not None]
+
+
+def apply_balance_deltas(conn, deltas):
+    # deltas: iterable of (table, account id, amount); summed per account, one UPDATE each
+    totals = {}
+    for table, account_id, amount in deltas:
+        key = (table, account_id)
+        totals[key] = totals.get(key, 0.0) + amount
+
+    for table, column in BALANCE_COLUMNS.items():
+        params = [
+            {"amt": round(amt, 2), "id": account_id}
+            for (tbl, account_id), amt in totals.items() if tbl == table and amt
+        ]
+        if params:
+            conn.execute(text(f"""
+                UPDATE {table}
+                SET {column} = {column} + :amt
+                WHERE id = :id
+            """), params)
+    return len(totals)
+
+
+def apply_expense_rows(conn, rows):
+    apply_balance_deltas(conn, [delta for row in rows for delta in balance_deltas(row._mapping)])
+
+
+def ensure_watermark_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_WATERMARK_TABLE))
+
+
+def lock_watermark(conn, user_id):
+    # Row lock serialises every balance writer for this user until the transaction ends.
+    # A missing watermark means any existing expenses were applied by the old per-row
+    # code, so it starts at the user's latest id rather than replaying their history.
+    conn.execute(text("""
+        INSERT IGNORE INTO balance_watermarks (user_id, last_applied_id)
+        SELECT :user_id, COALESCE(MAX(id), 0) FROM expenses WHERE user_id = :user_id
+    """), {"user_id": user_id})
+    return conn.execute(text("""
+        SELECT last_applied_id FROM balance_watermarks WHERE user_id = :user_id FOR UPDATE
+    """), {"user_id": user_id}).scalar()
+
+
+def advance_watermark(conn, user_id, last_id):
+    conn.execute(text("""
+        UPDATE balance_watermarks SET last_applied_id = :last_id
+        WHERE user_id = :user_id AND last_applied_id < :last_id
+    """), {"last_id": last_id, "user_id": user_id})
+
+
+def apply_pending_expenses(conn, user_id, limit=None):
+    watermark = lock_watermark(conn, user_id)
+    query = f"""
+        SELECT e.id, e.user_id, e.type, e.amount, e.payment_method, e.used_credit_card,
+               e.paid_to, e.is_splitwise, e.splitwise_person,
+               {resolved_id_columns("e")}
+        FROM expenses e
+        WHERE e.user_id = :user_id AND e.id > :watermark
+        ORDER BY e.id
+    """
+    params = {"user_id": user_id, "watermark": watermark}
+    if limit:
+        query += " LIMIT :limit"
+        params["limit"] = limit
+    rows = conn.execute(text(query), params).fetchall()
+
+    if rows:
+        apply_expense_rows(conn, rows)
+        advance_watermark(conn, user_id, rows[-1].id)
+    return len(rows)
+
+
+def catch_up_balances(engine, user_id=None, batch_size=1000):
+    ensure_watermark_table(engine)
+
+    query = """
+        SELECT DISTINCT e.user_id
+        FROM expenses e
+        LEFT JOIN balance_watermarks w ON w.user_id = e.user_id
+        WHERE e.id > COALESCE(w.last_applied_id, 0)
+    """
     params = {}
+    if user_id:
+        query += " AND e.user_id = :user_id"
+        params = {"user_id": user_id}
+
+    with engine.connect() as conn:
+        user_ids = [row.user_id for row in conn.execute(text(query), params)]
 
+    applied = 0
+    for uid in user_ids:
+        while True:
+            # One transaction per batch: a crash loses at most the batch in flight, never half of it
+            with engine.begin() as conn:
+                count = apply_pending_expenses(conn, uid, batch_size)
+            applied += count
+            if count < batch_size:
+                break
+
+    print(f"✅ Balances caught up: {applied} expenses applied for {len(user_ids)} users.")
+    return applied
+
+
+def update_balances_from_expenses(engine, last_id=None, set_based=True):
     if last_id:
-        query += " WHERE id = :last_id"
-        params = {"last_id": last_id}
-    else:
-        query += " ORDER BY id"
+        with engine.connect() as conn:
+            user_id = conn.execute(
+                text("SELECT user_id FROM expenses WHERE id = :last_id"), {"last_id": last_id}
+            ).scalar()
+        return catch_up_balances(engine, user_id)
+    if set_based:
+        return rebuild_balances_from_expenses(engine)
+    return catch_up_balances(engine)
 
-    with engine.connect() as conn:
-        result = conn.execute(text(query), params)
-        rows = result.fetchall()
 
-    with engine.begin() as conn:
-        for row in rows:
-            r = row._mapping
-            amount = float(r["amount"])
-            tx_type = r["type"]
-            method = r["payment_method"]
-            credit_card = r["used_credit_card"]
-            paid_to = r["paid_to"]
-            is_splitwise = str(r["is_splitwise"]).lower() == "yes"
-            person = r["splitwise_person"]
-            user_id = r["user_id"]
-
-            # ========== INCOME ==========
-            if tx_type == "income":
-                if method:
-                    conn.execute(text("""
-                        UPDATE checking_accounts
-                        SET current_balance = current_balance + :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": amount, "name": method, "user_id": user_id})
-                if is_splitwise and person:
-                    # they paid me → reduce what they owe me
-                    conn.execute(text("""
-                        UPDATE splitwise_people
-                        SET net_balance = net_balance + :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": amount, "name": person, "user_id": user_id})
-
-            # ========== EXPENSE ==========
-            elif tx_type == "expense":
-                if is_splitwise and person:
-                    delta = -amount if amount > 0 else abs(amount)
-                    sign = -1 if amount > 0 else 1
-                    conn.execute(text("""
-                        UPDATE splitwise_people
-                        SET net_balance = net_balance + :delta
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"delta": sign * abs(amount), "name": person, "user_id": user_id})
-                else:
-                    if credit_card:
-                        conn.execute(text("""
-                            UPDATE credit_cards
-                            SET used_limit = used_limit + :amt
-                            WHERE name = :name AND user_id = :user_id
-                        """), {"amt": abs(amount), "name": credit_card, "user_id": user_id})
-                    elif method:
-                        conn.execute(text("""
-                            UPDATE checking_accounts
-                            SET current_balance = current_balance - :amt
-                            WHERE name = :name AND user_id = :user_id
-                        """), {"amt": abs(amount), "name": method, "user_id": user_id})
-
-            # ========== TRANSFER ==========
-            elif tx_type == "transfer":
-                if is_splitwise:
-                    continue
-                if method:
-                    conn.execute(text("""
-                        UPDATE checking_accounts
-                        SET current_balance = current_balance - :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": abs(amount), "name": method, "user_id": user_id})
-                if paid_to:
-                    conn.execute(text("""
-                        UPDATE checking_accounts
-                        SET current_balance = current_balance + :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": abs(amount), "name": paid_to, "user_id": user_id})
-
-            # ========== DEBT PAYMENT ==========
-            elif tx_type == "debt_payment":
-                if method:
-                    conn.execute(text("""
-                        UPDATE checking_accounts
-                        SET current_balance = current_balance - :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": abs(amount), "name": method, "user_id": user_id})
-
-                if paid_to:
-                    result = conn.execute(text("""
-                        SELECT COUNT(*) FROM credit_cards
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"name": paid_to, "user_id": user_id})
-                    if result.scalar() > 0:
-                        conn.execute(text("""
-                            UPDATE credit_cards
-                            SET used_limit = used_limit - :amt
-                            WHERE name = :name AND user_id = :user_id
-                        """), {"amt": abs(amount), "name": paid_to, "user_id": user_id})
-
-                if is_splitwise and person:
-                    conn.execute(text("""
-                        UPDATE splitwise_people
-                        SET net_balance = net_balance - :amt
-                        WHERE name = :name AND user_id = :user_id
-                    """), {"amt": abs(amount), "name": person, "user_id": user_id})
-
-    print("✅ All balances updated.")
+if __name__ == "__main__":
+    # Safe to run from cron: only expenses above each user's watermark are applied
+    catch_up_balances(get_engine())
@@ -0,0 +1,53 @@
+import sys
+from sqlalchemy import text
+from db.connection import get_engine
+from db.migrations import CREATE_ROLLUP_TABLE, FILL_ROLLUPS
+
+
+def ensure_rollup_table(conn):
+    conn.execute(text(CREATE_ROLLUP_TABLE))
+
+
+def apply_rollup_deltas(conn, deltas):
+    # deltas: dicts with user_id, month, type, cat_id, subcat_id, amt, cnt; one multi-row upsert
+    if not deltas:
+        return
+    conn.execute(text("""
+        INSERT INTO expense_rollups (user_id, month, type, category_id, subcategory_id, total_amount, txn_count)
+        VALUES (:user_id, :month, :type, :cat_id, :subcat_id, :amt, :cnt)
+        ON DUPLICATE KEY UPDATE
+            total_amount = total_amount + VALUES(total_amount),
+            txn_count = txn_count + VALUES(txn_count)
+    """), deltas)
+
+
+def apply_expense_to_rollups(conn, user_id, date, tx_type, category_id, subcategory_id, amount):
+    # Must run on the same connection/transaction as the expense INSERT
+    apply_rollup_deltas(conn, [{
+        "user_id": user_id,
+        "month": date.replace(day=1),
+        "type": tx_type,
+        "cat_id": category_id or 0,
+        "subcat_id": subcategory_id or 0,
+        "amt": amount,
+        "cnt": 1,
+    }])
+
+
+def rebuild_rollups(engine, user_id=None):
+    where = "WHERE user_id = :user_id" if user_id else ""
+    params = {"user_id": user_id} if user_id else {}
+
+    with engine.begin() as conn:
+        ensure_rollup_table(conn)
+        conn.execute(text(f"DELETE FROM expense_rollups {where}"), params)
+        result = conn.execute(text(FILL_ROLLUPS.format(where=where)), params)
+
+    print(f"✅ Rebuilt {result.rowcount} rollup rows.")
+
+
+if __name__ == "__main__":
+    # Usage: python rollups.py [user_id]
+    # (balances are caught up separately by python process_expenses.py)
+    args = sys.argv[1:]
+    rebuild_rollups(get_engine(), int(args[0]) if args else None)
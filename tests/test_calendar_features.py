@@ -0,0 +1,27 @@
+from datetime import date
+
+import pandas as pd
+
+from calendar_features import DEFAULT_PERIOD, period_bounds, week_of_month
+
+
+def test_week_of_month_matches_the_per_row_formula():
+    dates = pd.Series(pd.date_range("2023-01-01", "2025-12-31", freq="D"))
+    # The formula the reports applied row by row before it was vectorized
+    expected = [int((d.day + d.replace(day=1).weekday() - 1) / 7) + 1 for d in dates]
+
+    weeks = week_of_month(dates)
+
+    assert weeks.tolist() == expected
+    assert weeks.dtype == "int8"
+
+
+def test_week_of_month_starts_weeks_on_monday():
+    # March 2024 starts on a Friday: Fri-Sun are week 1, Monday the 4th opens week 2
+    weeks = week_of_month(pd.Series(pd.to_datetime(["2024-03-01", "2024-03-03", "2024-03-04", "2024-03-31"])))
+    assert weeks.tolist() == [1, 1, 2, 5]
+
+
+def test_default_period_spans_several_months():
+    start, end = period_bounds(DEFAULT_PERIOD, date(2024, 3, 15))
+    assert (start, end) == (date(2023, 12, 1), date(2024, 3, 31))
@@ -0,0 +1,30 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+
+from views.charts import render_chart
+
+
+def _draw_then_fail(df):
+    plt.subplots()
+    raise ValueError("bad data")
+
+
+def _draw(df):
+    fig, ax = plt.subplots()
+    ax.plot(df["x"], df["y"])
+    return fig
+
+
+def test_figures_are_closed_even_when_draw_raises():
+    df = pd.DataFrame({"x": [1, 2], "y": [3, 4]})
+
+    assert render_chart(_draw, df).startswith(b"\x89PNG")
+    with pytest.raises(ValueError):
+        render_chart(_draw_then_fail, df)
+
+    assert plt.get_fignums() == []
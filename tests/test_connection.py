@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy.engine import make_url
+
+from db.connection import get_engine_url
+
+
+def test_password_survives_the_url_unchanged(monkeypatch):
+    monkeypatch.setenv("DB_PASSWORD", "p@ss word+/%:")
+    url = make_url(get_engine_url().render_as_string(hide_password=False))
+    assert url.password == "p@ss word+/%:"
+
+
+def test_missing_password_fails_clearly(monkeypatch):
+    monkeypatch.delenv("DB_PASSWORD", raising=False)
+    with pytest.raises(RuntimeError, match="DB_PASSWORD"):
+        get_engine_url()
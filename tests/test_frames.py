@@ -0,0 +1,15 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from db.frames import compact_frame
+
+
+def test_money_columns_keep_exact_cents():
+    df = compact_frame(pd.DataFrame({
+        "name": ["Chase", "Amex"],
+        "current_balance": [Decimal("250123.45"), Decimal("1234.56")],
+    }))
+
+    assert df["current_balance"].dtype == "float64"
+    assert [f"{v!r}" for v in df["current_balance"]] == ["250123.45", "1234.56"]
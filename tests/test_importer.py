@@ -0,0 +1,113 @@
+import io
+from datetime import date
+
+import pandas as pd
+
+from importer import (
+    add_fingerprints, iter_csv_batches, normalize_expenses, parse_statement_file, resolve_reference_ids,
+    validate_expenses,
+)
+
+STATEMENT = """Date,Type,Amount,Payment Method,Used Credit Card,Category,Subcategory,Description
+2024-03-01,expense,12.50,Checking,,Food,Groceries,Market
+2024-03-02,expense,40.00,Checking,,Travel,,Train
+"""
+
+
+def test_blank_name_column_becomes_none():
+    # An all-empty column is read as float64 NaN; it must reach the database as NULL, not 'nan'
+    batch = next(iter_csv_batches(io.StringIO(STATEMENT), batch_size=100))
+    assert batch["Used Credit Card"].dtype == "float64"
+
+    df, rejected = validate_expenses(normalize_expenses(batch, user_id=1))
+
+    assert rejected == 0
+    assert df["used_credit_card"].tolist() == [None, None]
+    assert df["subcategory"].tolist() == ["Groceries", None]
+    assert df["payment_method"].tolist() == ["Checking", "Checking"]
+
+
+def test_reference_names_match_like_mysql_collation():
+    refs = {
+        "categories": pd.DataFrame({"id": [7, 3], "name": ["food", "Food "]}),
+        "subcategories": pd.DataFrame({"id": [11], "category_name": ["FOOD"], "sub_category_name": ["Groceries"]}),
+        "checking_accounts": pd.DataFrame({"id": [5], "name": ["Chase Checking"]}),
+        "credit_cards": pd.DataFrame({"id": [], "name": []}),
+        "splitwise_people": pd.DataFrame({"id": [], "name": []}),
+    }
+    df = pd.DataFrame({
+        "category": ["Food", "Travel", None], "subcategory": ["groceries  ", None, None],
+        "payment_method": ["CHASE CHECKING", None, None], "used_credit_card": [None] * 3,
+        "paid_to": [None] * 3, "splitwise_person": [None] * 3,
+    })
+
+    resolved = resolve_reference_ids(df, refs)
+
+    assert resolved["category_id"].tolist() == [3, pd.NA, pd.NA]
+    assert resolved["subcategory_id"].tolist() == [11, pd.NA, pd.NA]
+    assert resolved["payment_account_id"].tolist() == [5, pd.NA, pd.NA]
+    assert resolved["category"].tolist() == ["Food", "Travel", None]
+
+
+
+def _statement(**overrides):
+    row = {
+        "user_id": 1, "date": date(2024, 3, 1), "amount": 12.5, "description": "Coffee  Shop",
+        "used_credit_card": "Amex", "payment_method": "Chase",
+    }
+    return pd.DataFrame([{**row, **overrides}])
+
+
+def test_fingerprints_are_stable_across_imports():
+    first = add_fingerprints(_statement())["fingerprint"].iloc[0]
+    again = add_fingerprints(_statement(description=" coffee shop "))["fingerprint"].iloc[0]
+    assert first == again
+    assert len(first) == 40
+
+
+def test_identical_rows_get_distinct_fingerprints_by_occurrence():
+    df = pd.concat([_statement(), _statement()], ignore_index=True)
+    fingerprints = add_fingerprints(df)["fingerprint"]
+    assert fingerprints.nunique() == 2
+
+    # The counter carries across batches of one import, so a split file fingerprints the same
+    seen = {}
+    split = [add_fingerprints(_statement(), seen)["fingerprint"].iloc[0] for _ in range(2)]
+    assert split == fingerprints.tolist()
+
+
+def test_occurrence_state_keeps_only_the_trailing_date():
+    days = [date(2024, 3, d) for d in (1, 1, 2, 3, 3)]
+    batch = pd.concat([_statement(date=day) for day in days], ignore_index=True)
+    seen = {}
+    add_fingerprints(batch, seen)
+    assert list(seen) == [date(2024, 3, 3)]
+
+    # The next batch continues the trailing date's count
+    whole = add_fingerprints(pd.concat([batch, _statement(date=date(2024, 3, 3))], ignore_index=True))
+    following = add_fingerprints(_statement(date=date(2024, 3, 3)), seen)
+    assert following["fingerprint"].iloc[0] == whole["fingerprint"].iloc[-1]
+
+
+def test_fingerprint_source_falls_back_to_payment_method():
+    by_method = add_fingerprints(_statement(used_credit_card=None, payment_method="AMEX"))["fingerprint"]
+    by_card = add_fingerprints(_statement())["fingerprint"]
+    other = add_fingerprints(_statement(used_credit_card="", payment_method="Chase"))["fingerprint"]
+    assert by_method.iloc[0] == by_card.iloc[0]
+    assert other.iloc[0] != by_card.iloc[0]
+
+
+def test_parsed_statements_are_spooled_in_bounded_batches(tmp_path):
+    rows = "\n".join(f"2024-03-{d:02d},expense,5.00,Checking,,Food,,Lunch" for d in range(1, 26))
+    statement = tmp_path / "statement.csv"
+    statement.write_text(STATEMENT.splitlines()[0] + "\n" + rows + "\n")
+    spool_dir = tmp_path / "spool"
+    spool_dir.mkdir()
+
+    parsed = parse_statement_file(str(statement), 1, str(spool_dir), batch_size=10)
+
+    assert parsed["error"] is None
+    batches = [pd.read_pickle(path) for path in parsed["batches"]]
+    assert [len(df) for df in batches] == [10, 10, 5]
+    whole = validate_expenses(normalize_expenses(pd.read_csv(statement), 1))[0]
+    assert pd.concat(batches)["fingerprint"].tolist() == add_fingerprints(whole)["fingerprint"].tolist()
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from load_master_data import MASTER_TABLES, diff_table, read_master_file
+
+SPECS = {spec["table"]: spec for spec in MASTER_TABLES}
+
+
+def test_diff_matches_names_like_mysql_collation():
+    existing = [{"id": 1, "name": "Chase", "total_limit": 100}, {"id": 2, "name": "CHASE", "total_limit": 5}]
+    incoming = pd.DataFrame({"name": ["chase ", "Amex"], "total_limit": [250.0, 50.0], "used_limit": [0.0, 0.0]})
+
+    inserts, updates, unchanged = diff_table(SPECS["credit_cards"], incoming, existing)
+
+    assert [row["name"] for row in inserts] == ["Amex"]
+    assert [(row["id"], row["total_limit"]) for row in updates] == [(1, 250.0)]
+    assert unchanged == 0
+
+
+def test_blank_cells_are_read_as_null(tmp_path):
+    pd.DataFrame({
+        "category_name": ["Food", "food ", None],
+        "sub_category_name": ["Dining", "dining", "Misc"],
+    }).to_excel(tmp_path / "subcategories.xlsx", index=False)
+
+    df = read_master_file(SPECS["subcategories"], tmp_path)
+
+    assert df.to_dict("records") == [
+        {"category_name": "food", "sub_category_name": "dining"},
+        {"category_name": None, "sub_category_name": "Misc"},
+    ]
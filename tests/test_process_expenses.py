@@ -0,0 +1,89 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from db.expense_ids import resolved_id_columns
+from process_expenses import BALANCE_DELTAS_QUERY, FLAGGED_EXPENSES, balance_deltas
+
+ACCOUNTS = {
+    "checking_accounts": ["Chase", "BofA"],
+    "credit_cards": ["Amex", "Visa"],
+    "splitwise_people": ["Bob", "Ann"],
+}
+
+
+@pytest.fixture
+def engine():
+    # Random expenses over two users, including blank and unknown account names
+    rng = random.Random(7)
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE expenses (
+                id INTEGER PRIMARY KEY, user_id INT, type TEXT, amount NUMERIC,
+                payment_method TEXT, used_credit_card TEXT, paid_to TEXT, category TEXT, subcategory TEXT,
+                is_splitwise TEXT, splitwise_person TEXT,
+                category_id INT, subcategory_id INT, payment_account_id INT, credit_card_id INT,
+                paid_to_account_id INT, paid_to_card_id INT, splitwise_person_id INT
+            )
+        """))
+        conn.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("CREATE TABLE subcategories (id INTEGER PRIMARY KEY, category_name TEXT, sub_category_name TEXT)"))
+        conn.execute(text("CREATE TABLE balance_watermarks (user_id INT PRIMARY KEY, last_applied_id INT)"))
+        for table, names in ACCOUNTS.items():
+            conn.execute(text(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, user_id INT, name TEXT)"))
+            for user_id in (1, 2):
+                for name in names:
+                    conn.execute(text(f"INSERT INTO {table} (user_id, name) VALUES (:u, :n)"), {"u": user_id, "n": name})
+
+        for _ in range(2000):
+            conn.execute(text("""
+                INSERT INTO expenses (user_id, type, amount, payment_method, used_credit_card, paid_to,
+                                      is_splitwise, splitwise_person)
+                VALUES (:u, :t, :a, :m, :cc, :p, :sw, :sp)
+            """), {
+                "u": rng.choice([1, 2]),
+                "t": rng.choice(["income", "expense", "transfer", "debt_payment"]),
+                "a": round(rng.uniform(-50, 500), 2),
+                "m": rng.choice(["Chase", "BofA", "", None]),
+                "cc": rng.choice(["Amex", "Visa", "", None, "Ghost"]),
+                "p": rng.choice(["Chase", "Amex", "Visa", "BofA", "", None, "Nobody"]),
+                "sw": rng.choice(["Yes", "No", "yes", None]),
+                "sp": rng.choice(["Bob", "Ann", "", None]),
+            })
+    return engine
+
+
+def _totals(deltas):
+    totals = {}
+    for table, account_id, amount in deltas:
+        totals[(table, account_id)] = round(totals.get((table, account_id), 0.0) + float(amount), 2)
+    return {key: amount for key, amount in totals.items() if amount}
+
+
+def test_set_based_deltas_match_row_by_row(engine):
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT e.id, e.type, e.amount, e.payment_method, e.used_credit_card,
+                   e.paid_to, e.is_splitwise, e.splitwise_person,
+                   {resolved_id_columns("e")}
+            FROM expenses e
+            ORDER BY e.id
+        """)).fetchall()
+        set_based = conn.execute(text(FLAGGED_EXPENSES + BALANCE_DELTAS_QUERY), {"upto": rows[-1].id}).fetchall()
+
+    row_by_row = _totals(delta for row in rows for delta in balance_deltas(row._mapping))
+
+    assert row_by_row
+    assert _totals((d.tbl, d.account_id, d.delta) for d in set_based) == row_by_row
+
+
+def test_unknown_names_change_nothing():
+    expense = {
+        "type": "expense", "amount": 20, "payment_method": "Chase", "used_credit_card": "Ghost",
+        "paid_to": None, "is_splitwise": "No", "splitwise_person": None,
+        "payment_account_id": 1, "credit_card_id": None,
+    }
+    # The card branch is taken on the name, and an unresolved card id applies nothing
+    assert balance_deltas(expense) == []
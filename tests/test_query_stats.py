@@ -0,0 +1,19 @@
+from sqlalchemy import create_engine, text
+
+from db.query_stats import _estimate_bytes, attach_query_stats, start_rerun
+
+
+def test_estimate_bytes_scales_a_sample_by_row_count():
+    rows = [("abcd", 1, None)] * 1000
+    assert _estimate_bytes(rows, len(rows)) == 12 * 1000
+    assert _estimate_bytes((), 0) == 0
+
+
+def test_statements_are_recorded_only_inside_a_rerun():
+    engine = attach_query_stats(create_engine("sqlite://"))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        rerun = start_rerun("test")
+        conn.execute(text("SELECT 2"))
+
+    assert [r["statement"] for r in rerun["statements"]] == ["SELECT 2"]
@@ -0,0 +1,22 @@
+from sqlalchemy import create_engine, text
+
+from db.reference_data import get_reference_values, invalidate_reference_data
+
+
+def test_account_lookups_are_cached_per_user():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE credit_cards (id INTEGER PRIMARY KEY, user_id INT, name TEXT)"))
+        conn.execute(text("INSERT INTO credit_cards (user_id, name) VALUES (1, 'Amex'), (2, 'Visa')"))
+    invalidate_reference_data()
+
+    assert get_reference_values(engine, "credit_cards", {"uid": 1}) == ["Amex"]
+    assert get_reference_values(engine, "credit_cards", {"uid": 2}) == ["Visa"]
+
+    # Adding a card for one user refreshes only that user's copy
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO credit_cards (user_id, name) VALUES (1, 'Chase'), (2, 'Citi')"))
+    invalidate_reference_data("credit_cards", {"uid": 1})
+
+    assert get_reference_values(engine, "credit_cards", {"uid": 1}) == ["Amex", "Chase"]
+    assert get_reference_values(engine, "credit_cards", {"uid": 2}) == ["Visa"]
@@ -0,0 +1,41 @@
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+from db.transactions import fetch_transactions_page
+
+
+def _all_pages(conn, filters):
+    ids, before = [], None
+    while True:
+        df, before = fetch_transactions_page(conn, 1, filters, before, page_size=4)
+        ids += df["id"].tolist()
+        if before is None:
+            return ids
+
+
+def test_pages_walk_ids_or_dates_newest_first():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE expenses (
+                id INTEGER PRIMARY KEY, user_id INT, date TEXT, type TEXT, amount NUMERIC,
+                category TEXT, subcategory TEXT, category_id INT, payment_method TEXT,
+                paid_to TEXT, description TEXT
+            )
+        """))
+        # Imported late, so ids do not follow dates
+        for i in range(1, 21):
+            conn.execute(
+                text("INSERT INTO expenses (id, user_id, date, type, amount, category_id) VALUES (:i, 1, :d, 'expense', 1, :c)"),
+                {"i": i, "d": str(date(2024, 3, 1 + (i * 7) % 10)), "c": i % 2},
+            )
+
+        assert _all_pages(conn, {"category_id": 1}) == list(range(19, 0, -2))
+
+        rows = conn.execute(text("""
+            SELECT id FROM expenses WHERE date >= '2024-03-02' AND date <= '2024-03-08'
+            ORDER BY date DESC, id DESC
+        """)).scalars().all()
+        filters = {"start_date": date(2024, 3, 2), "end_date": date(2024, 3, 8)}
+        assert _all_pages(conn, filters) == rows
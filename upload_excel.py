@@ -1,48 +1,30 @@
-import pandas as pd
-from sqlalchemy import text
+import sys
 from db.connection import get_engine
-
-# Load Excel file
-df = pd.read_excel('data/expenses.xlsx')
-
-# Normalize column names
-df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
-
-# Convert 'yes'/'no' in 'is_splitwise' to boolean
-df["is_splitwise"] = df["is_splitwise"].apply(lambda x: str(x).strip().lower() == "yes")
-
-# Preview loaded data
-print("Loaded data:")
-print(df.head())
-
-# Connect to MySQL
-engine = get_engine()
-
-# Insert rows into 'expenses' table
-with engine.begin() as conn:
-    for _, row in df.iterrows():
-        query = text("""
-            INSERT INTO expenses (
-                date, amount, type, payment_method_id,
-                category_id, subcategory_id,
-                is_splitwise, description
-            ) VALUES (
-                :date, :amount, :type, :payment_method_id,
-                :category_id, :subcategory_id,
-                :is_splitwise, :description
-            )
-        """)
-
-        # TEMP: using placeholder IDs until lookup is implemented
-        conn.execute(query, {
-            "date": row["date"],
-            "amount": row["amount"],
-            "type": row["type"],
-            "payment_method_id": 1,
-            "category_id": 1,
-            "subcategory_id": 1,
-            "is_splitwise": row["is_splitwise"],
-            "description": row.get("description", "")
-        })
-
-print("✅ Excel data uploaded to MySQL successfully.")
+from importer import import_statement_file, import_statement_files, expand_statement_paths
+
+# Usage: python upload_excel.py <user_id> [file | directory | glob] [--workers N]
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = None
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+
+    user_id = int(args[0])
+    target = args[1] if len(args) > 1 else "data/expenses.xlsx"
+    paths = expand_statement_paths(target)
+
+    if len(paths) == 1 and paths[0] == target:
+        def progress(inserted, rejected):
+            print(f"… {inserted} rows imported, {rejected} rejected")
+
+        import_statement_file(get_engine(), target, user_id, progress=progress)
+        print("✅ Statement uploaded to MySQL successfully.")
+    elif paths:
+        results = import_statement_files(get_engine(), paths, user_id, workers=workers)
+        if any(r["error"] for r in results):
+            sys.exit(1)
+    else:
+        print(f"❌ No CSV/XLSX statements found for {target}")
+        sys.exit(1)
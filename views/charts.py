@@ -0,0 +1,80 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+
+# Rendered charts cached per process as PNG bytes, keyed by a hash of the drawing function
+# and the aggregated data it plots. Unchanged data is a dictionary lookup instead of a
+# matplotlib render; the cache is an LRU bounded by total bytes.
+
+CHART_CACHE_BYTES = int(os.getenv("CHART_CACHE_BYTES", 32 * 1024 * 1024))
+CHART_DPI = 200
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+# pyplot keeps one figure registry per process; sessions render one at a time
+_pyplot_lock = threading.Lock()
+
+
+def _digest_part(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr((list(names), str(value.dtypes))).encode())
+    else:
+        digest.update(repr(value).encode())
+
+
+def chart_key(draw, *data, **options):
+    digest = hashlib.sha1(f"{draw.__module__}.{draw.__qualname__}".encode())
+    for value in data:
+        _digest_part(digest, value)
+    _digest_part(digest, sorted(options.items()))
+    return digest.hexdigest()
+
+
+def render_chart(draw, *data, **options):
+    # draw(*data, **options) builds and returns a matplotlib figure
+    global _cache_bytes
+    key = chart_key(draw, *data, **options)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    buffer = io.BytesIO()
+    with _pyplot_lock:
+        open_before = set(plt.get_fignums())
+        try:
+            fig = draw(*data, **options)
+            fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        finally:
+            # Never leave figures registered with pyplot, even when draw raises
+            # part way through; they would pile up per session
+            for num in set(plt.get_fignums()) - open_before:
+                plt.close(num)
+    image = buffer.getvalue()
+
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = image
+            _cache_bytes += len(image)
+        while _cache_bytes > CHART_CACHE_BYTES and len(_cache) > 1:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+    return image
+
+
+def show_chart(draw, *data, **options):
+    st.image(render_chart(draw, *data, **options), use_column_width="auto")
+
+
+def chart_cache_info():
+    with _cache_lock:
+        return {"charts": len(_cache), "bytes": _cache_bytes, "limit_bytes": CHART_CACHE_BYTES}
@@ -1,50 +1,160 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
 import streamlit as st
-import pandas as pd
 from sqlalchemy import text
 
+from db.frames import read_frame
+from db.reference_data import get_reference_values
+from db.transactions import fetch_transactions_page
+
+# (query, success message, error label) per panel, rendered in this order
+PANELS = [
+    (
+        """
+        SELECT date, type, amount, payment_method, used_credit_card, paid_to,
+               category, subcategory, is_splitwise, splitwise_person, description
+        FROM expenses WHERE user_id = :uid ORDER BY id DESC LIMIT 5
+        """,
+        "✅ Fetched recent data",
+        "❌ Recent data error",
+    ),
+    (
+        "SELECT name, current_balance FROM checking_accounts WHERE user_id = :uid",
+        "✅ Fetched checking account balances",
+        "❌ Checking accounts error",
+    ),
+    (
+        "SELECT name, total_limit, used_limit, available_limit FROM credit_cards WHERE user_id = :uid",
+        "✅ Fetched credit card data",
+        "❌ Credit cards error",
+    ),
+    (
+        "SELECT name, net_balance, last_updated FROM splitwise_people WHERE user_id = :uid",
+        "✅ Fetched Splitwise data",
+        "❌ Splitwise error",
+    ),
+]
+
+TRANSACTION_TYPES = ["expense", "income", "transfer", "debt_payment"]
+PAGE_SIZE = 25
+
+# Shared across sessions so concurrent dashboards cannot exhaust the connection pool
+_panel_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DASHBOARD_WORKERS", 4)),
+    thread_name_prefix="dashboard",
+)
+
+
+def _load_panel(engine, query, user_id):
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        df = read_frame(conn, text(query), {"uid": user_id}, label=" ".join(query.split())[:60])
+    return df, (time.perf_counter() - started) * 1000
+
+
 def show_dashboard(engine, user_id):
     st.subheader("📊 Dashboard")
 
-    try:
-        with engine.connect() as conn:
-            recent_df = pd.read_sql(
-                text("SELECT * FROM expenses WHERE user_id = :uid ORDER BY id DESC LIMIT 5"),
-                conn, params={"uid": user_id}
-            )
-        st.success("✅ Fetched recent data")
-        st.dataframe(recent_df)
-    except Exception as e:
-        st.error(f"❌ Recent data error: {e}")
+    # copy_context keeps query stats attributed to this rerun/view inside the worker threads
+    started = time.perf_counter()
+    futures = [
+        _panel_executor.submit(copy_context().run, _load_panel, engine, query, user_id)
+        for query, _, _ in PANELS
+    ]
 
-    try:
-        with engine.connect() as conn:
-            checking_df = pd.read_sql(
-                text("SELECT name, current_balance FROM checking_accounts WHERE user_id = :uid"),
-                conn, params={"uid": user_id}
-            )
-        st.success("✅ Fetched checking account balances")
-        st.dataframe(checking_df)
-    except Exception as e:
-        st.error(f"❌ Checking accounts error: {e}")
+    timings = []
+    for future, (_, success_msg, error_label) in zip(futures, PANELS):
+        try:
+            df, elapsed_ms = future.result()
+            timings.append(elapsed_ms)
+            st.success(success_msg)
+            st.caption(f"⏱️ {elapsed_ms:,.0f} ms")
+            st.dataframe(df)
+        except Exception as e:
+            st.error(f"{error_label}: {e}")
+
+    total_ms = (time.perf_counter() - started) * 1000
+    st.caption(f"⏱️ Dashboard loaded in {total_ms:,.0f} ms (panels sum to {sum(timings):,.0f} ms)")
+
+    show_transaction_browser(engine, user_id)
 
-    try:
-        with engine.connect() as conn:
-            credit_df = pd.read_sql(
-                text("SELECT name, total_limit, used_limit, available_limit FROM credit_cards WHERE user_id = :uid"),
-                conn, params={"uid": user_id}
-            )
-        st.success("✅ Fetched credit card data")
-        st.dataframe(credit_df)
-    except Exception as e:
-        st.error(f"❌ Credit cards error: {e}")
 
+def _load_transactions_page(engine, user_id, filters, before):
+    with engine.connect() as conn:
+        return fetch_transactions_page(conn, user_id, filters, before, PAGE_SIZE)
+
+
+def _next_page(next_before):
+    st.session_state.txn_cursors.append(next_before)
+
+
+def _prev_page():
+    st.session_state.txn_cursors.pop()
+
+
+def show_transaction_browser(engine, user_id):
+    st.markdown("### 📜 Transaction History")
+
+    categories = sorted({
+        name for t in TRANSACTION_TYPES
+        for name in get_reference_values(engine, "categories", {"t": t})
+    })
+    methods = get_reference_values(engine, "payment_methods")
+
+    col1, col2, col3 = st.columns(3)
+    type_ = col1.selectbox("Type", ["All"] + TRANSACTION_TYPES, key="txn_type")
+    category = col2.selectbox("Category", ["All"] + categories, key="txn_category")
+    method = col3.selectbox("Payment Method", ["All"] + methods, key="txn_method")
+    col4, col5 = st.columns(2)
+    start_date = col4.date_input("From", value=None, key="txn_start")
+    end_date = col5.date_input("To", value=None, key="txn_end")
+
+    category_id = None
+    if category != "All":
+        category_id = get_reference_values(engine, "category_id", {"name": category})[0]
+
+    filters = {
+        "type": type_ if type_ != "All" else None,
+        "category_id": category_id,
+        "payment_method": method if method != "All" else None,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+    # Any filter change restarts paging from the newest transaction
+    if st.session_state.get("txn_filters") != filters:
+        st.session_state.txn_filters = filters
+        st.session_state.txn_cursors = [None]
+        st.session_state.txn_prefetch = None
+
+    before = st.session_state.txn_cursors[-1]
+    prefetch = st.session_state.get("txn_prefetch")
     try:
-        with engine.connect() as conn:
-            splitwise_df = pd.read_sql(
-                text("SELECT name, net_balance, last_updated FROM splitwise_people WHERE user_id = :uid"),
-                conn, params={"uid": user_id}
-            )
-        st.success("✅ Fetched Splitwise data")
-        st.dataframe(splitwise_df)
+        if prefetch and prefetch[0] == before:
+            df, next_before = prefetch[1].result()
+        else:
+            df, next_before = _load_transactions_page(engine, user_id, filters, before)
     except Exception as e:
-        st.error(f"❌ Splitwise error: {e}")
+        st.error(f"❌ Transaction history error: {e}")
+        return
+
+    # Warm the next page in the background while the user reads this one
+    st.session_state.txn_prefetch = None
+    if next_before:
+        st.session_state.txn_prefetch = (
+            next_before,
+            _panel_executor.submit(
+                copy_context().run, _load_transactions_page, engine, user_id, filters, next_before
+            ),
+        )
+
+    st.dataframe(df.drop(columns=["id"]), use_container_width=True)
+
+    page = len(st.session_state.txn_cursors)
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    col_prev.button("⬅️ Newer", on_click=_prev_page, disabled=page == 1, key="txn_prev")
+    col_page.caption(f"Page {page}")
+    col_next.button("Older ➡️", on_click=_next_page, args=(next_before,), disabled=not next_before, key="txn_next")
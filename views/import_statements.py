@@ -0,0 +1,23 @@
+import streamlit as st
+from importer import import_statement_file
+
+
+def show_statement_import(engine, user_id):
+    st.subheader("📥 Import Statement")
+
+    uploaded = st.file_uploader("Statement file (CSV or XLSX)", type=["csv", "xlsx"])
+    if uploaded and st.button("Import"):
+        status = st.empty()
+
+        def progress(inserted, rejected):
+            status.info(f"⏳ {inserted:,} rows imported, {rejected:,} rejected...")
+
+        try:
+            report = import_statement_file(engine, uploaded, user_id, filename=uploaded.name, progress=progress)
+            status.success(
+                f"✅ Imported {report['rows']:,} rows ({report['duplicates']:,} already imported, "
+                f"{report['rejected']:,} rejected) "
+                f"in {report['seconds']:,.1f}s"
+            )
+        except Exception as e:
+            status.error(f"❌ Import failed: {e}")
@@ -1,14 +1,7 @@
 import streamlit as st
-import pandas as pd
 from sqlalchemy import text
-from db.connection import get_engine
-from process_expenses import update_balances_from_expenses
-
-
-def fetch_column_values(query, params=None):
-    with get_engine().connect() as conn:
-        df = pd.read_sql(query, conn, params=params)
-    return df.iloc[:, 0].tolist()
+from db.reference_data import get_reference_values, invalidate_reference_data
+from ledger import record_expense
 
 
 def show_expense_form(engine, user_id):
@@ -17,10 +10,7 @@ def show_expense_form(engine, user_id):
     type_ = st.selectbox("Type", ["expense", "income", "transfer", "debt_payment"])
 
     # --- Category ---
-    categories = fetch_column_values(
-        text("SELECT name FROM categories WHERE type = :t"),
-        {"t": type_}
-    )
+    categories = get_reference_values(engine, "categories", {"t": type_})
     category_options = categories + ["➕ Add New"]
     category = st.selectbox("Category", category_options)
 
@@ -32,16 +22,14 @@ def show_expense_form(engine, user_id):
                     text("INSERT INTO categories (name, type) VALUES (:name, :type)"),
                     {"name": new_cat.strip(), "type": type_}
                 )
+            invalidate_reference_data("categories")
             st.success("✅ Category added!")
             st.session_state.just_submitted = True
             st.rerun()
 
     subcategory = ""
     if category != "➕ Add New":
-        subcategories = fetch_column_values(
-            text("SELECT sub_category_name FROM subcategories WHERE category_name = :cat"),
-            {"cat": category}
-        )
+        subcategories = get_reference_values(engine, "subcategories", {"cat": category})
         subcat_options = subcategories + ["➕ Add New"]
         subcategory = st.selectbox("Subcategory", subcat_options)
 
@@ -50,9 +38,13 @@ def show_expense_form(engine, user_id):
             if new_subcat and st.button("Add Subcategory"):
                 with engine.begin() as conn:
                     conn.execute(
-                        text("INSERT INTO subcategories (category_name, sub_category_name) VALUES (:cat, :sub)"),
+                        text("""
+                            INSERT INTO subcategories (category_name, sub_category_name, category_id)
+                            SELECT :cat, :sub, MIN(id) FROM categories WHERE name = :cat
+                        """),
                         {"cat": category, "sub": new_subcat.strip()}
                     )
+                invalidate_reference_data("subcategories")
                 st.success("✅ Subcategory added!")
                 st.session_state.just_submitted = True
                 st.rerun()
@@ -61,7 +53,7 @@ def show_expense_form(engine, user_id):
     is_splitwise = st.checkbox("Splitwise?")
     splitwise_person = None
     if is_splitwise:
-        people = fetch_column_values(text("SELECT name FROM splitwise_people"))
+        people = get_reference_values(engine, "splitwise_people", {"uid": user_id})
         person_options = people + ["➕ Add New"]
         splitwise_person = st.selectbox("Who Paid?", person_options)
 
@@ -70,15 +62,16 @@ def show_expense_form(engine, user_id):
             if new_person and st.button("Add Person"):
                 with engine.begin() as conn:
                     conn.execute(
-                        text("INSERT INTO splitwise_people (name, net_balance) VALUES (:name, 0.00)"),
-                        {"name": new_person.strip()}
+                        text("INSERT INTO splitwise_people (user_id, name, net_balance) VALUES (:uid, :name, 0.00)"),
+                        {"uid": user_id, "name": new_person.strip()}
                     )
+                invalidate_reference_data("splitwise_people", {"uid": user_id})
                 st.success("✅ Person added!")
                 st.session_state.just_submitted = True
                 st.rerun()
 
     # --- Payment Method ---
-    methods = fetch_column_values(text("SELECT name FROM payment_methods"))
+    methods = get_reference_values(engine, "payment_methods")
     method_options = methods + ["➕ Add New"]
     payment_method = st.selectbox("Payment Method", method_options)
 
@@ -90,12 +83,13 @@ def show_expense_form(engine, user_id):
                     text("INSERT INTO payment_methods (name) VALUES (:name)"),
                     {"name": new_method.strip()}
                 )
+            invalidate_reference_data("payment_methods")
             st.success("✅ Payment method added!")
             st.session_state.just_submitted = True
             st.rerun()
 
     # --- Credit Card ---
-    credit_cards = fetch_column_values(text("SELECT name FROM credit_cards"))
+    credit_cards = get_reference_values(engine, "credit_cards", {"uid": user_id})
     cc_options = [""] + credit_cards + ["➕ Add New"]
     used_credit_card = st.selectbox("Used Credit Card (if applicable)", cc_options)
 
@@ -105,9 +99,10 @@ def show_expense_form(engine, user_id):
         if new_card and st.button("Add Credit Card"):
             with engine.begin() as conn:
                 conn.execute(
-                    text("INSERT INTO credit_cards (name, total_limit, used_limit) VALUES (:name, :limit, 0.0)"),
-                    {"name": new_card.strip(), "limit": new_limit}
+                    text("INSERT INTO credit_cards (user_id, name, total_limit, used_limit) VALUES (:uid, :name, :limit, 0.0)"),
+                    {"uid": user_id, "name": new_card.strip(), "limit": new_limit}
                 )
+            invalidate_reference_data("credit_cards", {"uid": user_id})
             st.success("✅ Credit card added!")
             st.session_state.just_submitted = True
             st.rerun()
@@ -118,7 +113,7 @@ def show_expense_form(engine, user_id):
     )
 
     # --- Paid To / Received From ---
-    checking = fetch_column_values(text("SELECT name FROM checking_accounts"))
+    checking = get_reference_values(engine, "checking_accounts", {"uid": user_id})
     payees = checking + credit_cards
     paid_to_options = [""] + payees + ["➕ Add New"]
     paid_to = st.selectbox("Paid To / Received From", paid_to_options)
@@ -131,9 +126,10 @@ def show_expense_form(engine, user_id):
             if new_payee and st.button("Add New Credit Card"):
                 with engine.begin() as conn:
                     conn.execute(
-                        text("INSERT INTO credit_cards (name, total_limit, used_limit) VALUES (:name, :limit, 0.0)"),
-                        {"name": new_payee.strip(), "limit": card_limit}
+                        text("INSERT INTO credit_cards (user_id, name, total_limit, used_limit) VALUES (:uid, :name, :limit, 0.0)"),
+                        {"uid": user_id, "name": new_payee.strip(), "limit": card_limit}
                     )
+                invalidate_reference_data("credit_cards", {"uid": user_id})
                 st.success("✅ Credit card added!")
                 st.session_state.just_submitted = True
                 st.rerun()
@@ -142,9 +138,10 @@ def show_expense_form(engine, user_id):
             if new_payee and st.button("Add New Checking Account"):
                 with engine.begin() as conn:
                     conn.execute(
-                        text("INSERT INTO checking_accounts (name, current_balance) VALUES (:name, :bal)"),
-                        {"name": new_payee.strip(), "bal": balance}
+                        text("INSERT INTO checking_accounts (user_id, name, current_balance) VALUES (:uid, :name, :bal)"),
+                        {"uid": user_id, "name": new_payee.strip(), "bal": balance}
                     )
+                invalidate_reference_data("checking_accounts", {"uid": user_id})
                 st.success("✅ Checking account added!")
                 st.session_state.just_submitted = True
                 st.rerun()
@@ -158,41 +155,20 @@ def show_expense_form(engine, user_id):
 
     if submitted:
         try:
-            with engine.begin() as conn:
-                conn.execute(
-                    text("""
-                        INSERT INTO expenses (
-                            date, type, amount, payment_method,
-                            used_credit_card, paid_to,
-                            category, subcategory,
-                            is_splitwise, splitwise_person, description,
-                            user_id
-                        )
-                        VALUES (
-                            :date, :type, :amount, :method,
-                            :credit, :paid_to, :cat, :subcat,
-                            :splitwise, :person, :desc,
-                            :user_id
-                        )
-                    """),
-                    {
-                        "date": date,
-                        "type": type_,
-                        "amount": amount,
-                        "method": payment_method if payment_method != "➕ Add New" else new_method,
-                        "credit": used_credit_card if used_credit_card != "➕ Add New" else new_card,
-                        "paid_to": paid_to if paid_to != "➕ Add New" else new_payee,
-                        "cat": category,
-                        "subcat": subcategory,
-                        "splitwise": "Yes" if is_splitwise else "No",
-                        "person": splitwise_person if splitwise_person != "➕ Add New" else new_person,
-                        "desc": description,
-                        "user_id": user_id
-                    }
-                )
-                last_id = conn.execute(text("SELECT LAST_INSERT_ID()")).scalar()
-
-            update_balances_from_expenses(engine, last_id)
+            record_expense(engine, {
+                "date": date,
+                "type": type_,
+                "amount": amount,
+                "payment_method": payment_method if payment_method != "➕ Add New" else new_method,
+                "used_credit_card": used_credit_card if used_credit_card != "➕ Add New" else new_card,
+                "paid_to": paid_to if paid_to != "➕ Add New" else new_payee,
+                "category": category,
+                "subcategory": subcategory,
+                "is_splitwise": "Yes" if is_splitwise else "No",
+                "splitwise_person": splitwise_person if splitwise_person != "➕ Add New" else new_person,
+                "description": description,
+                "user_id": user_id
+            })
             st.session_state.just_submitted = True
             st.rerun()
 
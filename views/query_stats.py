@@ -0,0 +1,37 @@
+import json
+import streamlit as st
+import pandas as pd
+
+
+def show_query_stats(rerun, summary, pool_status=None):
+    with st.sidebar.expander("🛠️ Query Stats", expanded=False):
+        st.caption(f"Rerun {summary['rerun_id']} · {summary['label']}")
+        col1, col2 = st.columns(2)
+        col1.metric("Queries", summary["queries"])
+        col2.metric("SQL Time", f"{summary['elapsed_ms']:,.0f} ms")
+        col1.metric("Rows", f"{summary['rows']:,}")
+        col2.metric("Bytes", f"{summary['bytes']:,}")
+        col1.metric("Frame Memory", f"{summary['frame_bytes']:,}")
+
+        if summary["views"]:
+            st.markdown("**Per View**")
+            st.dataframe(pd.DataFrame.from_dict(summary["views"], orient="index"))
+
+        if rerun["statements"]:
+            st.markdown("**Statements**")
+            st.dataframe(pd.DataFrame(rerun["statements"])[["view", "elapsed_ms", "rows", "bytes", "statement"]])
+
+        if rerun.get("frames"):
+            st.markdown("**DataFrames**")
+            st.dataframe(pd.DataFrame(rerun["frames"])[["label", "rows", "bytes", "raw_bytes"]])
+
+        if pool_status:
+            st.markdown("**Connection Pool**")
+            st.json({k: v for k, v in pool_status.items() if k != "status"})
+
+        st.download_button(
+            "⬇️ Download JSON",
+            json.dumps({"summary": summary, "statements": rerun["statements"], "frames": rerun.get("frames", [])}, indent=2, default=str),
+            file_name=f"query_stats_{summary['rerun_id']}.json",
+            mime="application/json",
+        )
@@ -2,9 +2,20 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import text
+
+from calendar_features import (
+    DEFAULT_PERIOD, DEFAULT_TRAILING_MONTHS, PERIODS, add_calendar_features, period_bounds, week_totals
+)
+from db.report_cache import get_data_version, get_report_data
+from db.report_queries import fetch_outstanding_balances
+from db.report_source import lazy_report_source
+from views.charts import show_chart
+
+# Sections whose widgets should rerun on their own; a plain function on Streamlit
+# versions without fragments, where the cached sections above them make a rerun cheap
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
 
 
 def show_reports(engine):
@@ -15,173 +26,205 @@ def show_reports(engine):
         st.error("User not authenticated.")
         return
 
-    with engine.connect() as conn:
-        df = pd.read_sql(
-            text("SELECT * FROM expenses WHERE type = 'expense' AND user_id = :uid"),
-            conn,
-            params={"uid": user_id}
-        )
+    today = datetime.today()
+    this_month_start = datetime(today.year, today.month, 1)
+    this_month_end = (this_month_start + relativedelta(months=1, days=-1)).date()
+    last_month_start = this_month_start - relativedelta(months=1)
+
+    # Trend, category, income and debt figures cover the selected period;
+    # the weekly comparison and projection are always this month vs last
+    start, end = select_period(today.date())
+
+    # Every section reads through the report cache, keyed on this version. Misses share
+    # one source for the whole rerun, opened by the first of them.
+    version = get_data_version(engine, user_id)
+
+    with lazy_report_source(engine, user_id) as source:
+        def data(name, *args):
+            return get_report_data(source, user_id, version, name, *args)
 
-        df['date'] = pd.to_datetime(df['date'])
+        show_monthly_trend(data("fetch_monthly_totals", start, end))
 
-        # =========================
-        # Monthly Expense Trend
-        # =========================
-        df['month'] = df['date'].dt.to_period('M')
-        monthly = df.groupby('month')['amount'].sum().reset_index()
-        monthly['month'] = monthly['month'].dt.strftime('%b %Y')
-        monthly = monthly.tail(4)
+        daily_df = add_calendar_features(data("fetch_daily_totals", last_month_start.date(), this_month_end))
+        show_weekly_breakdown(daily_df, this_month_start, last_month_start)
 
-        st.markdown("### 📅 Monthly Expense Trend")
-        fig1, ax1 = plt.subplots(figsize=(8, 4))
-        bars = ax1.bar(monthly['month'], monthly['amount'], color='royalblue')
+        cat_summary = data("fetch_category_totals", start, end)
+        show_category_totals(cat_summary)
+        show_category_drilldown(source, user_id, version, start, end, cat_summary)
+
+        show_income_summary(data("fetch_salary_income", start, end))
+        show_projected_spend(daily_df[daily_df['date'] >= this_month_start], today)
+        show_debt_summary(data("fetch_debt_payment_totals", start, end))
+    show_outstanding_balances(engine, user_id)
+
+
+# =========================
+# Period Selector
+# =========================
+def select_period(today):
+    col1, col2 = st.columns(2)
+    period = col1.selectbox("Period", PERIODS, index=PERIODS.index(DEFAULT_PERIOD), key="report_period")
+
+    if period == "Trailing Months":
+        months = col2.number_input(
+            "Months", min_value=1, max_value=120, value=DEFAULT_TRAILING_MONTHS, key="report_months"
+        )
+        return period_bounds(period, today, months=int(months))
+    if period == "Custom Range":
+        picked = col2.date_input("Date range", value=(today.replace(day=1), today), key="report_range")
+        # The range picker returns a single date until the second one is chosen
+        picked = tuple(picked) if isinstance(picked, (tuple, list)) else (picked,)
+        return period_bounds(period, today, custom=(picked[0], picked[-1]))
+
+    start, end = period_bounds(period, today)
+    col2.caption(f"{start:%b %d, %Y} – {end:%b %d, %Y}")
+    return start, end
+
+
+# =========================
+# Monthly Expense Trend
+# =========================
+def show_monthly_trend(monthly):
+    st.markdown("### 📅 Monthly Expense Trend")
+    show_chart(draw_monthly_trend, monthly)
+
+
+def draw_monthly_trend(monthly):
+    fig1, ax1 = plt.subplots(figsize=(8, 4))
+    bars = ax1.bar(monthly['month'], monthly['amount'], color='royalblue')
+    for bar in bars:
+        yval = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width() / 2, yval + 50, f"${yval:,.0f}", ha='center')
+    ax1.set_ylabel("Amount ($)")
+    return fig1
+
+
+# =========================
+# Weekly Spend Breakdown
+# =========================
+def show_weekly_breakdown(daily_df, this_month_start, last_month_start):
+    this_month, last_month = pd.Period(this_month_start, 'M'), pd.Period(last_month_start, 'M')
+    weeks = week_totals(daily_df, [this_month, last_month])
+
+    compare_df = pd.DataFrame({
+        'Week': [f"Week {i}" for i in weeks.index],
+        'This Month': weeks[this_month].values,
+        'Last Month': weeks[last_month].values
+    })
+
+    st.markdown("### 📅 Weekly Spend Breakdown")
+    show_chart(draw_weekly_breakdown, compare_df)
+
+
+def draw_weekly_breakdown(compare_df):
+    fig2, ax2 = plt.subplots(figsize=(8, 4))
+    bar_width = 0.35
+    index = range(len(compare_df))
+
+    bars1 = ax2.bar([i - bar_width / 2 for i in index], compare_df['Last Month'], bar_width, label='Last Month', color='skyblue')
+    bars2 = ax2.bar([i + bar_width / 2 for i in index], compare_df['This Month'], bar_width, label='This Month', color='orange')
+
+    for bars in [bars1, bars2]:
         for bar in bars:
             yval = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width() / 2, yval + 50, f"${yval:,.0f}", ha='center')
-        ax1.set_ylabel("Amount ($)")
-        st.pyplot(fig1)
-
-        # =========================
-        # Weekly Spend Breakdown
-        # =========================
-        def get_week_of_month(dt):
-            first_day = dt.replace(day=1)
-            dom = dt.day
-            adjusted_dom = dom + first_day.weekday()
-            return int((adjusted_dom - 1) / 7) + 1
-
-        df['week_of_month'] = df['date'].apply(get_week_of_month)
-
-        today = datetime.today()
-        this_month_start = datetime(today.year, today.month, 1)
-        last_month_start = this_month_start - relativedelta(months=1)
-        last_month_end = this_month_start - timedelta(days=1)
-
-        this_month_df = df[(df['date'] >= this_month_start) & (df['date'] < this_month_start + relativedelta(months=1))]
-        last_month_df = df[(df['date'] >= last_month_start) & (df['date'] <= last_month_end)]
-
-        def get_week_totals(data):
-            return [data[data['week_of_month'] == i]['amount'].sum() for i in range(1, 5)]
-
-        compare_df = pd.DataFrame({
-            'Week': [f"Week {i}" for i in range(1, 5)],
-            'This Month': get_week_totals(this_month_df),
-            'Last Month': get_week_totals(last_month_df)
-        })
-
-        st.markdown("### 📅 Weekly Spend Breakdown")
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-        bar_width = 0.35
-        index = range(len(compare_df))
-
-        bars1 = ax2.bar([i - bar_width / 2 for i in index], compare_df['Last Month'], bar_width, label='Last Month', color='skyblue')
-        bars2 = ax2.bar([i + bar_width / 2 for i in index], compare_df['This Month'], bar_width, label='This Month', color='orange')
-
-        for bars in [bars1, bars2]:
-            for bar in bars:
-                yval = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width() / 2, yval + 10, f"${yval:,.0f}", ha='center', va='bottom')
-
-        ax2.set_xticks(index)
-        ax2.set_xticklabels(compare_df['Week'])
-        ax2.set_ylabel("Amount ($)")
-        ax2.legend()
-        st.pyplot(fig2)
-
-        # =========================
-        # Category-wise Expense
-        # =========================
-        cat_df = df[df['category'].notnull() & (df['category'].str.strip() != '') & (df['category'] != 'Income')]
-        cat_summary = cat_df.groupby('category')['amount'].sum().sort_values(ascending=False)
-
-        st.markdown("### 📊 Category-wise Expense")
-        fig3, ax3 = plt.subplots(figsize=(10, 4))
-        bars = ax3.bar(cat_summary.index, cat_summary.values, color='dodgerblue')
-        for bar, value in zip(bars, cat_summary.values):
-            ax3.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 50, f"${value:,.0f}", ha='center', va='bottom')
-        ax3.set_ylabel("Amount ($)")
-        ax3.set_xlabel("Category")
-        plt.xticks(rotation=30)
-        st.pyplot(fig3)
-
-        # =========================
-        # Category Drill-Down
-        # =========================
-        st.markdown("### 🔍 Category Drill-down")
-        selected_category = st.selectbox("Select a Category to view subcategory-wise spend:", options=cat_summary.index.tolist())
-
-        if selected_category:
-            drill_df = cat_df[cat_df['category'] == selected_category]
-            sub_summary = drill_df.groupby('subcategory')['amount'].sum().sort_values(ascending=False)
-
-            fig_sub, ax_sub = plt.subplots(figsize=(8, 4))
-            bars = ax_sub.bar(sub_summary.index, sub_summary.values, color='mediumseagreen')
-            for bar, value in zip(bars, sub_summary.values):
-                ax_sub.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 10, f"${value:,.0f}", ha='center', va='bottom')
-            ax_sub.set_ylabel("Amount ($)")
-            ax_sub.set_xlabel("Subcategory")
-            ax_sub.set_title(f"Subcategory-wise Spend: {selected_category}")
-            plt.xticks(rotation=30)
-            st.pyplot(fig_sub)
-
-        # =========================
-        # Income Summary
-        # =========================
-        with engine.connect() as conn4:
-            income_total = pd.read_sql(
-                text("SELECT SUM(amount) as total FROM expenses WHERE type='income' AND subcategory='Salary' AND user_id = :uid"),
-                conn4,
-                params={"uid": user_id}
-            )['total'][0] or 0
-
-        st.markdown("### 💰 Income Summary")
-        st.metric("👨‍💼 Total Salary Income", f"${income_total:,.2f}")
-
-        # =========================
-        # Projected Spend
-        # =========================
-        today_day = today.day
-        total_days = calendar.monthrange(today.year, today.month)[1]
-        current_spend = this_month_df['amount'].sum()
-        projected_spend = (current_spend / today_day) * total_days if today_day else 0
-
-        st.markdown("### 📉 Projected Spend")
-        st.metric("📈 Projected End-of-Month Spend", f"${projected_spend:,.2f}")
-
-        # =========================
-        # Debt Payment Summary
-        # =========================
-        with engine.connect() as conn2:
-            debt_df = pd.read_sql(
-                text("SELECT * FROM expenses WHERE type = 'debt_payment' AND user_id = :uid"),
-                conn2,
-                params={"uid": user_id}
-            )
-
-        credit_card_total = debt_df[debt_df['subcategory'].str.contains("Credit Card", na=False)]['amount'].sum()
-        splitwise_total = debt_df[debt_df['subcategory'].str.contains("Splitwise", na=False)]['amount'].sum()
-        india_transfer_total = debt_df[
-            debt_df['subcategory'].fillna('').str.contains("India Transfer", case=False) |
-            debt_df['paid_to'].fillna('').str.contains("India Transfer", case=False)
-        ]['amount'].sum()
-
-        st.markdown("### 💳 Debt Payments Summary")
-        col1, col2, col3 = st.columns(3)
-        col1.metric("💳 Credit Card Payments", f"${credit_card_total:,.2f}")
-        col2.metric("👥 Splitwise Payments", f"${splitwise_total:,.2f}")
-        col3.metric("🌐 India Transfers", f"${india_transfer_total:,.2f}")
-
-        # =========================
-        # Outstanding Balances
-        # =========================
-        st.markdown("### 🧾 Outstanding Balances")
-        with engine.connect() as conn:
-            credit_df = pd.read_sql(text("SELECT name, used_limit FROM credit_cards WHERE user_id = :uid"), conn, params={"uid": user_id})
-            splitwise_df = pd.read_sql(text("SELECT name, net_balance FROM splitwise_people WHERE user_id = :uid"), conn, params={"uid": user_id})
-
-        credit_out = credit_df["used_limit"].sum()
-        splitwise_owe = splitwise_df[splitwise_df["net_balance"] > 0]["net_balance"].sum()
-
-        col4, col5 = st.columns(2)
-        col4.metric("💳 Credit Cards Outstanding", f"${credit_out:,.2f}")
-        col5.metric("👥 Splitwise Outstanding", f"${splitwise_owe:,.2f}")
+            ax2.text(bar.get_x() + bar.get_width() / 2, yval + 10, f"${yval:,.0f}", ha='center', va='bottom')
+
+    ax2.set_xticks(index)
+    ax2.set_xticklabels(compare_df['Week'])
+    ax2.set_ylabel("Amount ($)")
+    ax2.legend()
+    return fig2
+
+
+# =========================
+# Category-wise Expense
+# =========================
+def show_category_totals(cat_summary):
+    st.markdown("### 📊 Category-wise Expense")
+    show_chart(draw_category_totals, cat_summary)
+
+
+def draw_category_totals(cat_summary):
+    fig3, ax3 = plt.subplots(figsize=(10, 4))
+    bars = ax3.bar(cat_summary['category'].astype(str), cat_summary['amount'], color='dodgerblue')
+    for bar, value in zip(bars, cat_summary['amount']):
+        ax3.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 50, f"${value:,.0f}", ha='center', va='bottom')
+    ax3.set_ylabel("Amount ($)")
+    ax3.set_xlabel("Category")
+    ax3.tick_params(axis='x', labelrotation=30)
+    return fig3
+
+
+# =========================
+# Category Drill-Down
+# =========================
+@fragment
+def show_category_drilldown(source, user_id, version, start, end, cat_summary):
+    st.markdown("### 🔍 Category Drill-down")
+    # Options are category ids; the names are only labels
+    names = dict(zip(cat_summary['category_id'].tolist(), cat_summary['category'].astype(str)))
+    selected_category = st.selectbox(
+        "Select a Category to view subcategory-wise spend:", options=list(names), format_func=names.get
+    )
+
+    if selected_category:
+        sub_summary = get_report_data(source, user_id, version, "fetch_subcategory_totals", start, end, selected_category)
+        show_chart(draw_subcategory_totals, sub_summary, category=names[selected_category])
+
+
+def draw_subcategory_totals(sub_summary, category):
+    fig_sub, ax_sub = plt.subplots(figsize=(8, 4))
+    bars = ax_sub.bar(sub_summary.index, sub_summary.values, color='mediumseagreen')
+    for bar, value in zip(bars, sub_summary.values):
+        ax_sub.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 10, f"${value:,.0f}", ha='center', va='bottom')
+    ax_sub.set_ylabel("Amount ($)")
+    ax_sub.set_xlabel("Subcategory")
+    ax_sub.set_title(f"Subcategory-wise Spend: {category}")
+    ax_sub.tick_params(axis='x', labelrotation=30)
+    return fig_sub
+
+
+# =========================
+# Income Summary
+# =========================
+def show_income_summary(income_total):
+    st.markdown("### 💰 Income Summary")
+    st.metric("👨‍💼 Total Salary Income", f"${income_total:,.2f}")
+
+
+# =========================
+# Projected Spend
+# =========================
+def show_projected_spend(this_month_df, today):
+    today_day = today.day
+    total_days = calendar.monthrange(today.year, today.month)[1]
+    current_spend = this_month_df['amount'].sum()
+    projected_spend = (current_spend / today_day) * total_days if today_day else 0
+
+    st.markdown("### 📉 Projected Spend")
+    st.metric("📈 Projected End-of-Month Spend", f"${projected_spend:,.2f}")
+
+
+# =========================
+# Debt Payment Summary
+# =========================
+def show_debt_summary(debt_totals):
+    st.markdown("### 💳 Debt Payments Summary")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("💳 Credit Card Payments", f"${debt_totals['credit_card']:,.2f}")
+    col2.metric("👥 Splitwise Payments", f"${debt_totals['splitwise']:,.2f}")
+    col3.metric("🌐 India Transfers", f"${debt_totals['india_transfer']:,.2f}")
+
+
+# =========================
+# Outstanding Balances
+# =========================
+def show_outstanding_balances(engine, user_id):
+    st.markdown("### 🧾 Outstanding Balances")
+    # Live balances always come from the database, uncached
+    with engine.connect() as conn:
+        outstanding = fetch_outstanding_balances(conn, user_id)
+
+    col4, col5 = st.columns(2)
+    col4.metric("💳 Credit Cards Outstanding", f"${outstanding['credit_cards']:,.2f}")
+    col5.metric("👥 Splitwise Outstanding", f"${outstanding['splitwise']:,.2f}")